@@ -0,0 +1,453 @@
+import asyncio
+import hashlib
+import logging
+import os
+import platform
+import re
+import shutil
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+from app.agent.process import run_process
+from app.core.config import settings
+from app.core.metrics import record_cache_event
+
+logger = logging.getLogger("build")
+
+# Content addressed cache of ready-to-use build environments.
+#
+# Layout of settings.BUILD_CACHE_DIR:
+#   envs/<key>/          a fully installed venv for one requirements set
+#   envs/<key>/.complete marker written last, its mtime is the LRU timestamp
+#   wheels/              local wheel store shared by every environment
+#
+# Projects never install into the cache directly. On a hit the cached
+# site-packages are hardlinked into the project's own venv (or referenced
+# through a .pth file when hardlinks are not possible). Venvs using the
+# .pth overlay are registered in envs/<key>/.overlays/, and eviction keeps
+# an environment while a registered venv still points at it.
+
+COMPLETE_MARKER = ".complete"
+PROJECT_KEY_MARKER = ".build_cache_key"
+INSTALLED_MARKER = ".installed_requirements"
+OVERLAY_PTH = "_build_cache_overlay.pth"
+OVERLAY_REFS_DIR = ".overlays"
+
+# Also exported as agent_cache_events_total{cache="build"}
+cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "builds_failed": 0}
+
+
+def _count(event: str):
+    cache_stats[event] += 1
+    record_cache_event("build", event)
+
+
+class _LockTable:
+    """asyncio locks by name, dropped once nobody holds or waits for them."""
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, name: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(name) or (asyncio.Lock(), 0)
+        self._locks[name] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[name]
+            if users == 1:
+                del self._locks[name]
+            else:
+                self._locks[name] = (lock, users - 1)
+
+
+_key_locks = _LockTable()
+_venv_locks = _LockTable()
+
+
+def normalize_requirements(requirements_text: str) -> List[str]:
+    """
+    Normalizes a requirements file so that ordering, comments, blank lines,
+    whitespace and case do not change the cache key.
+    """
+    lines = set()
+    for raw_line in requirements_text.splitlines():
+        line = re.split(r"\s+#", raw_line, maxsplit=1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        line = re.sub(r"\s+", "", line)
+        # Package names are case-insensitive and treat '_' and '-' the same
+        name_match = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$", line)
+        if name_match and not line.startswith("-"):
+            name = re.sub(r"[-_.]+", "-", name_match.group(1)).lower()
+            line = name + name_match.group(2)
+        lines.add(line)
+    return sorted(lines)
+
+
+def interpreter_tag() -> str:
+    return f"{sys.implementation.name}-{platform.python_version()}-{sys.platform}-{platform.machine()}"
+
+
+def environment_key(requirements_text: str) -> str:
+    payload = interpreter_tag() + "\n" + "\n".join(normalize_requirements(requirements_text))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def venv_python(venv_path: Path) -> Path:
+    if os.name == 'nt':
+        return venv_path / "Scripts" / "python.exe"
+    return venv_path / "bin" / "python"
+
+
+def venv_site_packages(venv_path: Path) -> Path:
+    if os.name == 'nt':
+        return venv_path / "Lib" / "site-packages"
+    return venv_path / "lib" / f"python{sys.version_info.major}.{sys.version_info.minor}" / "site-packages"
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return dict(cache_stats)
+
+
+def venv_lock(venv_path: Path):
+    """Serializes changes to one project venv (use with `async with`)."""
+    return _venv_locks.hold(str(venv_path))
+
+
+def has_environment(requirements_text: str) -> bool:
+    """Whether ensure_environment would be a cache hit."""
+    return (_envs_dir() / environment_key(requirements_text) / COMPLETE_MARKER).exists()
+
+
+def _cache_root() -> Path:
+    return Path(settings.BUILD_CACHE_DIR)
+
+
+def _envs_dir() -> Path:
+    return _cache_root() / "envs"
+
+
+def _wheels_dir() -> Path:
+    return _cache_root() / "wheels"
+
+
+async def _run(*cmd: str, cwd: Optional[Path] = None) -> tuple[int, str]:
+    result = await run_process(*cmd, cwd=cwd)
+    return result.returncode, result.output
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+async def _build_environment(key: str, requirements_text: str) -> Path:
+    envs_dir = _envs_dir()
+    wheels_dir = _wheels_dir()
+    envs_dir.mkdir(parents=True, exist_ok=True)
+    wheels_dir.mkdir(parents=True, exist_ok=True)
+
+    final_path = envs_dir / key
+    tmp_path = envs_dir / f"{key}.tmp-{uuid4().hex[:8]}"
+    req_file = tmp_path / "requirements.txt"
+
+    try:
+        code, output = await _run(sys.executable, "-m", "venv", str(tmp_path))
+        if code != 0:
+            raise Exception(f"Failed to create cached venv: {output[-500:]}")
+
+        req_file.write_text(requirements_text, encoding="utf-8")
+        python = str(venv_python(tmp_path))
+
+        # Fill the wheel store first so the next environment with overlapping
+        # requirements can install those packages without touching the index.
+        code, output = await _run(
+            python, "-m", "pip", "wheel", "-r", str(req_file),
+            "-w", str(wheels_dir), "--find-links", str(wheels_dir)
+        )
+        if code != 0:
+            raise Exception(f"Pip install failed: {output[-500:]}")
+
+        code, output = await _run(
+            python, "-m", "pip", "install", "--no-index",
+            "--find-links", str(wheels_dir), "-r", str(req_file)
+        )
+        if code != 0:
+            raise Exception(f"Pip install failed: {output[-500:]}")
+
+        (tmp_path / COMPLETE_MARKER).write_text(str(_dir_size(tmp_path)))
+
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another worker finished the same key first, keep theirs
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return final_path
+
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+async def ensure_environment(requirements_text: str) -> Path:
+    """
+    Returns the path of a cached environment with the given requirements
+    installed, building it on a miss.
+    """
+    key = environment_key(requirements_text)
+    env_path = _envs_dir() / key
+    marker = env_path / COMPLETE_MARKER
+
+    async with _key_locks.hold(key):
+        if marker.exists():
+            _count("hits")
+            os.utime(marker)
+            logger.info(f"Build cache hit: {key[:12]} (hits={cache_stats['hits']}, misses={cache_stats['misses']})")
+            return env_path
+
+        _count("misses")
+        logger.info(f"Build cache miss: {key[:12]} (hits={cache_stats['hits']}, misses={cache_stats['misses']})")
+
+        start = time.monotonic()
+        try:
+            env_path = await _build_environment(key, requirements_text)
+        except Exception:
+            _count("builds_failed")
+            raise
+        logger.info(f"Built cached environment {key[:12]} in {time.monotonic() - start:.1f}s")
+
+    await asyncio.to_thread(evict, keep={key})
+    return env_path
+
+
+def _link_tree(source: Path, destination: Path):
+    for root, dirs, files in os.walk(source):
+        rel = Path(root).relative_to(source)
+        target_dir = destination / rel
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            target = target_dir / name
+            if not target.exists():
+                os.link(os.path.join(root, name), target)
+
+
+def _overlay_targets(venv_path: Path) -> List[Path]:
+    pth = venv_site_packages(venv_path) / OVERLAY_PTH
+    if not pth.exists():
+        return []
+    return [Path(line.strip()) for line in pth.read_text().splitlines() if line.strip()]
+
+
+def overlay_intact(venv_path: Path) -> bool:
+    """False when the venv's .pth overlay points at an environment that no longer exists."""
+    return all(target.exists() for target in _overlay_targets(venv_path))
+
+
+def register_overlay(venv_path: Path):
+    """
+    Records venv_path as a user of the environments its overlay points at.
+    Needed again after the venv is moved (sandbox checkout).
+    """
+    envs_dir = _envs_dir().resolve()
+    for target in _overlay_targets(venv_path):
+        env_path = target
+        while env_path.parent != env_path and env_path.parent.resolve() != envs_dir:
+            env_path = env_path.parent
+        if env_path.parent == env_path or not env_path.exists():
+            continue
+        refs_dir = env_path / OVERLAY_REFS_DIR
+        refs_dir.mkdir(exist_ok=True)
+        ref_name = hashlib.sha256(str(venv_path.resolve()).encode()).hexdigest()[:16]
+        (refs_dir / ref_name).write_text(str(venv_path.resolve()))
+
+
+def _overlay_referenced(env_path: Path) -> bool:
+    """Whether a registered venv still uses env_path; stale registrations are removed."""
+    refs_dir = env_path / OVERLAY_REFS_DIR
+    if not refs_dir.is_dir():
+        return False
+
+    source = venv_site_packages(env_path)
+    referenced = False
+    for ref in refs_dir.iterdir():
+        try:
+            venv_path = Path(ref.read_text().strip())
+            in_use = source in _overlay_targets(venv_path)
+        except OSError:
+            in_use = False
+        if in_use:
+            referenced = True
+        else:
+            ref.unlink(missing_ok=True)
+    return referenced
+
+
+async def attach_environment(venv_path: Path, env_path: Path):
+    """
+    Gives the project venv the packages of a cached environment without
+    reinstalling them.
+    """
+    key = env_path.name
+    key_marker = venv_path / PROJECT_KEY_MARKER
+
+    if key_marker.exists() and key_marker.read_text().strip() == key and overlay_intact(venv_path):
+        return
+
+    if venv_path.exists():
+        shutil.rmtree(venv_path, ignore_errors=True)
+
+    # No pip needed in the project venv, it is provided by the cached packages
+    code, output = await _run(sys.executable, "-m", "venv", "--without-pip", str(venv_path))
+    if code != 0:
+        raise Exception(f"Failed to create venv: {output[-500:]}")
+
+    source = venv_site_packages(env_path)
+    destination = venv_site_packages(venv_path)
+
+    try:
+        await asyncio.to_thread(_link_tree, source, destination)
+        logger.info(f"Linked cached environment {key[:12]} into {venv_path}")
+    except OSError as e:
+        # Cross-device or no hardlink support: fall back to a .pth overlay
+        logger.info(f"Hardlinking failed ({e}), using .pth overlay for {key[:12]}")
+        destination.mkdir(parents=True, exist_ok=True)
+        (destination / OVERLAY_PTH).write_text(str(source) + "\n")
+        register_overlay(venv_path)
+
+    key_marker.write_text(key)
+
+
+def read_installed_requirements(venv_path: Path) -> Optional[set]:
+    marker = venv_path / INSTALLED_MARKER
+    if not marker.exists() or not venv_python(venv_path).exists():
+        return None
+    if not overlay_intact(venv_path):
+        # The cached environment behind the overlay was evicted; reinstall
+        logger.warning(f"Build cache overlay of {venv_path} is gone, reinstalling")
+        return None
+    return set(line for line in marker.read_text(encoding="utf-8").splitlines() if line)
+
+
+def write_installed_requirements(venv_path: Path, requirements: set):
+    (venv_path / INSTALLED_MARKER).write_text("\n".join(sorted(requirements)), encoding="utf-8")
+
+
+async def _install_fresh(venv_path: Path, requirements_text: str):
+    if settings.BUILD_CACHE_ENABLED:
+        env_path = await ensure_environment(requirements_text)
+        await attach_environment(venv_path, env_path)
+        return
+
+    if not venv_python(venv_path).exists():
+        logger.info("Creating virtual environment...")
+        code, output = await _run(sys.executable, "-m", "venv", str(venv_path))
+        if code != 0:
+            raise Exception(f"Failed to create venv: {output[-500:]}")
+
+    req_file = venv_path / ".requirements.txt"
+    req_file.write_text(requirements_text, encoding="utf-8")
+
+    logger.info("Installing requirements...")
+    code, output = await _run(str(venv_python(venv_path)), "-m", "pip", "install", "-r", str(req_file))
+    if code != 0:
+        logger.error(f"Pip install failed: {output}")
+        raise Exception(f"Pip install failed: {output[-500:]}")
+
+
+async def sync_environment(venv_path: Path, requirements_text: str):
+    """
+    Makes the project venv satisfy requirements_text.
+
+    Nothing is installed when the venv already has every requirement. When
+    it was populated for a different requirements set (e.g. by a speculative
+    install) only the added or changed lines are installed on top. Otherwise
+    the environment is created from the build cache (or a plain pip install).
+    Calls for the same venv are serialized.
+    """
+    async with venv_lock(venv_path):
+        needed = set(normalize_requirements(requirements_text))
+        installed = read_installed_requirements(venv_path)
+
+        if installed is not None:
+            missing = needed - installed
+            if not missing:
+                logger.info(f"Requirements already satisfied in {venv_path}")
+                return
+
+            logger.info(f"Reconciling {len(missing)} changed requirements: {sorted(missing)}")
+            cmd = [str(venv_python(venv_path)), "-m", "pip", "install"]
+            if _wheels_dir().exists():
+                cmd += ["--find-links", str(_wheels_dir())]
+            code, output = await _run(*cmd, *sorted(missing))
+            if code != 0:
+                logger.error(f"Pip install failed: {output}")
+                raise Exception(f"Pip install failed: {output[-500:]}")
+
+            write_installed_requirements(venv_path, installed | needed)
+            return
+
+        await _install_fresh(venv_path, requirements_text)
+        write_installed_requirements(venv_path, needed)
+
+
+def evict(keep: Optional[set] = None):
+    """
+    Removes least recently used environments, then the oldest wheels, until
+    the cache fits in settings.BUILD_CACHE_MAX_BYTES.
+    """
+    keep = keep or set()
+    envs_dir = _envs_dir()
+    wheels_dir = _wheels_dir()
+
+    entries = []
+    total = 0
+    if envs_dir.exists():
+        for env_path in envs_dir.iterdir():
+            marker = env_path / COMPLETE_MARKER
+            if not marker.exists():
+                continue
+            try:
+                size = int(marker.read_text() or 0)
+            except ValueError:
+                size = _dir_size(env_path)
+            entries.append((marker.stat().st_mtime, size, env_path))
+            total += size
+
+    wheels = []
+    if wheels_dir.exists():
+        for wheel in wheels_dir.iterdir():
+            stat = wheel.stat()
+            wheels.append((stat.st_mtime, stat.st_size, wheel))
+            total += stat.st_size
+
+    if total <= settings.BUILD_CACHE_MAX_BYTES:
+        return
+
+    for _, size, env_path in sorted(entries):
+        if total <= settings.BUILD_CACHE_MAX_BYTES:
+            return
+        if env_path.name in keep or _overlay_referenced(env_path):
+            continue
+        shutil.rmtree(env_path, ignore_errors=True)
+        total -= size
+        _count("evictions")
+        logger.info(f"Evicted cached environment {env_path.name[:12]}")
+
+    for _, size, wheel in sorted(wheels):
+        if total <= settings.BUILD_CACHE_MAX_BYTES:
+            return
+        wheel.unlink(missing_ok=True)
+        total -= size
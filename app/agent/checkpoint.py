@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Optional
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from app.core.config import settings
+
+logger = logging.getLogger("agent")
+
+# Postgres-backed LangGraph checkpointer. Every job runs as its own thread
+# (thread_id = job_id), so a job picked up again after a crash or a failed
+# attempt continues from the last node that completed.
+
+_pool: Optional[AsyncConnectionPool] = None
+_saver: Optional[AsyncPostgresSaver] = None
+_lock = asyncio.Lock()
+
+
+def checkpoint_dsn() -> str:
+    # The saver uses psycopg 3 directly, so drop any SQLAlchemy driver suffix
+    scheme, rest = settings.DATABASE_URL.split("://", 1)
+    return f"postgresql://{rest}" if scheme.startswith("postgres") else settings.DATABASE_URL
+
+
+def thread_config(job_id: str) -> dict:
+    return {"configurable": {"thread_id": job_id}}
+
+
+async def get_checkpointer() -> Optional[AsyncPostgresSaver]:
+    """
+    Returns the shared saver, creating its tables on first use. None when
+    checkpointing is disabled.
+    """
+    global _pool, _saver
+    if not settings.CHECKPOINT_ENABLED:
+        return None
+    if _saver is not None:
+        return _saver
+
+    async with _lock:
+        if _saver is None:
+            pool = AsyncConnectionPool(
+                checkpoint_dsn(),
+                min_size=1,
+                max_size=settings.CHECKPOINT_POOL_SIZE,
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                open=False,
+            )
+            await pool.open()
+            saver = AsyncPostgresSaver(pool)
+            await saver.setup()
+            _pool, _saver = pool, saver
+            logger.info("Graph checkpointer ready.")
+    return _saver
+
+
+async def delete_checkpoints(job_id: str):
+    saver = await get_checkpointer()
+    if saver is not None:
+        await saver.adelete_thread(job_id)
+
+
+async def close_checkpointer():
+    global _pool, _saver
+    if _pool is not None:
+        await _pool.close()
+    _pool, _saver = None, None
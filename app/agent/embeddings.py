@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger("agent")
+
+class EmbeddingService:
+    """
+    Computes sentence embeddings off the event loop.
+
+    Concurrent embed() calls arriving within a short window are coalesced
+    into one model.encode() batch that runs in a thread pool, and results
+    for recently seen texts are served from an LRU cache. The model itself
+    is loaded lazily on first use, inside the pool.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_window_ms: int = 10,
+        max_batch_size: int = 32,
+        cache_size: int = 1024,
+        workers: int = 1,
+    ):
+        self.model_name = model_name
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache_size = cache_size
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set = set()
+
+        self.stats: Dict[str, int] = {"cache_hits": 0, "encoded": 0, "batches": 0}
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    logger.info(f"Loading embedding model {self.model_name}")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_model().encode(texts, batch_size=self.max_batch_size)
+        return [vector.tolist() for vector in vectors]
+
+    def _cache_get(self, text: str) -> Optional[List[float]]:
+        vector = self._cache.get(text)
+        if vector is not None:
+            self._cache.move_to_end(text)
+        return vector
+
+    def _cache_set(self, text: str, vector: List[float]):
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def embed(self, text: str) -> List[float]:
+        vector = self._cache_get(text)
+        if vector is not None:
+            self.stats["cache_hits"] += 1
+            return vector
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, immediate=True)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop)
+
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, immediate: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if immediate:
+            self._start_flush(loop)
+        else:
+            self._flush_handle = loop.call_later(self.batch_window, self._start_flush, loop)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = None
+        task = loop.create_task(self._flush())
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Identical texts in the same window are encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        loop = asyncio.get_running_loop()
+
+        try:
+            vectors = await loop.run_in_executor(self._executor, self._encode, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["encoded"] += len(texts)
+
+        by_text = dict(zip(texts, vectors))
+        for text, vector in by_text.items():
+            self._cache_set(text, vector)
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+embedding_service = EmbeddingService(
+    settings.EMBEDDING_MODEL_NAME,
+    batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    cache_size=settings.EMBEDDING_CACHE_SIZE,
+    workers=settings.EMBEDDING_WORKERS,
+)
@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+from app.agent.process import run_process
+from app.core.config import settings
+
+logger = logging.getLogger("build")
+
+# Store of ready-made frontend scaffolds (Vite React-TS + Tailwind, with
+# node_modules installed).
+#
+# Layout of settings.FRONTEND_TEMPLATE_DIR:
+#   <key>/frontend/     the scaffold, copied into projects as-is
+#   <key>/.complete     marker written last, its mtime is the LRU timestamp
+#   <key>/.sealed       node_modules files were made read-only
+#
+# Projects share the template's node_modules files through hardlinks, so
+# nothing may write into those files in place: it would change every
+# project built from the template. npm replaces package files (unlink and
+# create) rather than rewriting them, which is safe. The files npm and
+# build tools do rewrite (node_modules/.package-lock.json, tool caches) are
+# copied instead of linked. The template's node_modules files are read-only
+# so that an in-place write fails instead of spreading; processes running
+# as root bypass that, hence the copies.
+#
+# The key covers the template version setting, the dependency list and the
+# platform, so bumping FRONTEND_TEMPLATE_VERSION or changing the list builds
+# a new template on next use. Once a template exists no network access is
+# needed; when a new one cannot be built (e.g. offline) the most recent
+# existing template is used instead.
+
+COMPLETE_MARKER = ".complete"
+SEALED_MARKER = ".sealed"
+# Inside node_modules: files and directories rewritten in place by npm,
+# yarn, pnpm or build tools, copied into each project
+MUTABLE_NODE_MODULES_FILES = {".package-lock.json", ".yarn-integrity", ".modules.yaml", ".yarn-state.yml"}
+MUTABLE_NODE_MODULES_DIRS = {".cache", ".vite", ".vite-temp"}
+VITE_TEMPLATE = "react-ts"
+
+TEMPLATE_DEPENDENCIES = [
+    "react-query", "axios", "react-router-dom", "zod", "lucide-react",
+    "tailwindcss", "postcss", "autoprefixer", "clsx", "tailwind-merge"
+]
+
+TAILWIND_CONFIG = """/** @type {import('tailwindcss').Config} */
+export default {
+    content: [
+        "./index.html",
+        "./src/**/*.{js,ts,jsx,tsx}",
+    ],
+
+    theme: {
+        extend: {},
+    },
+
+    plugins: [],
+}
+"""
+
+TAILWIND_CSS = "@tailwind base;\n@tailwind components;\n@tailwind utilities;"
+
+template_stats: Dict[str, int] = {"hits": 0, "misses": 0, "builds_failed": 0, "fallbacks": 0}
+
+_key_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _npm() -> str:
+    return "npm.cmd" if os.name == 'nt' else "npm"
+
+
+def _npx() -> str:
+    return "npx.cmd" if os.name == 'nt' else "npx"
+
+
+def _npm_network_flag() -> str:
+    return "--offline" if settings.FRONTEND_OFFLINE else "--prefer-offline"
+
+
+def template_key(dependencies: Optional[List[str]] = None) -> str:
+    payload = json.dumps({
+        "version": settings.FRONTEND_TEMPLATE_VERSION,
+        "template": VITE_TEMPLATE,
+        "dependencies": sorted(dependencies or TEMPLATE_DEPENDENCIES),
+        "platform": f"{platform.system()}-{platform.machine()}",
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_template_stats() -> Dict[str, int]:
+    return dict(template_stats)
+
+
+def _store() -> Path:
+    return Path(settings.FRONTEND_TEMPLATE_DIR)
+
+
+def _complete_templates() -> List[Path]:
+    """Complete templates, most recently used first."""
+    if not _store().exists():
+        return []
+    templates = [path for path in _store().iterdir() if (path / COMPLETE_MARKER).exists()]
+    return sorted(templates, key=lambda path: (path / COMPLETE_MARKER).stat().st_mtime, reverse=True)
+
+
+async def _build_template(key: str, dependencies: List[str]) -> Path:
+    store = _store()
+    store.mkdir(parents=True, exist_ok=True)
+
+    final_path = store / key
+    tmp_path = store / f"{key}.tmp-{uuid4().hex[:8]}"
+    tmp_path.mkdir()
+    frontend_path = tmp_path / "frontend"
+
+    try:
+        # 1. Scaffolding (with -y to avoid interactive prompts)
+        result = await run_process(
+            _npm(), "create", _npm_network_flag(), "vite@latest", "frontend", "--", "-y", "--template", VITE_TEMPLATE,
+            cwd=tmp_path
+        )
+        if result.returncode != 0:
+            raise Exception(f"Vite scaffold failed: {result.output[-500:]}")
+
+        # 2. Base + additional dependencies in one install, from the npm cache when possible
+        result = await run_process(
+            _npm(), "install", _npm_network_flag(), "--no-audit", "--no-fund", *dependencies,
+            cwd=frontend_path,
+            timeout=settings.FRONTEND_INSTALL_TIMEOUT
+        )
+        if result.timed_out:
+            raise Exception("Frontend dependency installation timed out.")
+        if result.returncode != 0:
+            raise Exception(f"Frontend dependency installation failed: {result.output[-500:]}")
+
+        # 3. Setup Tailwind, then replace its config with one that covers the Vite sources
+        await run_process(_npx(), "tailwindcss", "init", "-p", cwd=frontend_path)
+        (frontend_path / "tailwind.config.js").write_text(TAILWIND_CONFIG, encoding="utf-8")
+        (frontend_path / "src" / "index.css").write_text(TAILWIND_CSS, encoding="utf-8")
+
+        seal(tmp_path)
+        (tmp_path / COMPLETE_MARKER).write_text(json.dumps({"dependencies": dependencies}))
+
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another worker finished the same key first, keep theirs
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return final_path
+
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+async def ensure_template(dependencies: Optional[List[str]] = None) -> Path:
+    """
+    Returns the directory of a complete template for the current version and
+    dependency set, building it on a miss. Falls back to the most recent
+    existing template if the build fails.
+    """
+    dependencies = list(dependencies or TEMPLATE_DEPENDENCIES)
+    key = template_key(dependencies)
+    template_path = _store() / key
+
+    lock = _key_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        marker = template_path / COMPLETE_MARKER
+        if marker.exists():
+            template_stats["hits"] += 1
+            os.utime(marker)
+            if not (template_path / SEALED_MARKER).exists():
+                # Built before templates were sealed
+                await asyncio.to_thread(seal, template_path)
+            logger.info(f"Frontend template hit: {key[:12]}")
+            return template_path
+
+        template_stats["misses"] += 1
+        logger.info(f"Frontend template miss: {key[:12]}, building...")
+
+        start = time.monotonic()
+        try:
+            template_path = await _build_template(key, dependencies)
+        except Exception as e:
+            template_stats["builds_failed"] += 1
+            previous = _complete_templates()
+            if not previous:
+                raise
+            template_stats["fallbacks"] += 1
+            logger.warning(f"Frontend template build failed ({e}), using previous template {previous[0].name[:12]}")
+            return previous[0]
+        logger.info(f"Built frontend template {key[:12]} in {time.monotonic() - start:.1f}s")
+
+    await asyncio.to_thread(prune, keep={key})
+    return template_path
+
+
+def seal(template_path: Path):
+    """Makes the template's node_modules files read-only."""
+    for root, dirs, files in os.walk(template_path / "frontend" / "node_modules"):
+        for name in files:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                os.chmod(path, os.stat(path).st_mode & ~0o222)
+    (template_path / SEALED_MARKER).write_text("")
+
+
+def _copy_writable(source: str, destination: str):
+    shutil.copy2(source, destination)
+    os.chmod(destination, os.stat(destination).st_mode | 0o200)
+
+
+def _is_mutable(relative: Path) -> bool:
+    return relative.name in MUTABLE_NODE_MODULES_FILES or any(
+        part in MUTABLE_NODE_MODULES_DIRS for part in relative.parts[:-1]
+    )
+
+
+def _link_node_modules(source: Path, destination: Path):
+    def copy(src: str, dst: str):
+        if _is_mutable(Path(src).relative_to(source)):
+            _copy_writable(src, dst)
+            return
+        try:
+            os.link(src, dst)
+        except OSError:
+            # Cross-device or no hardlink support
+            _copy_writable(src, dst)
+
+    shutil.copytree(source, destination, symlinks=True, copy_function=copy)
+
+
+def materialize(template_path: Path, frontend_path: Path):
+    """
+    Copies a template into a project. node_modules is hardlinked except for
+    the files tools rewrite in place (see above); everything else is copied
+    because generated code overwrites it.
+    """
+    source = template_path / "frontend"
+    frontend_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = frontend_path.with_name(f".{frontend_path.name}.tmp-{uuid4().hex[:8]}")
+
+    try:
+        shutil.copytree(
+            source, tmp_path, symlinks=True,
+            ignore=shutil.ignore_patterns("node_modules")
+        )
+        if (source / "node_modules").exists():
+            _link_node_modules(source / "node_modules", tmp_path / "node_modules")
+        # A half-copied scaffold must not look like a finished one
+        os.rename(tmp_path, frontend_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def prune(keep: Optional[set] = None):
+    """
+    Removes all but the settings.FRONTEND_TEMPLATE_KEEP most recently used
+    templates (and leftovers of interrupted builds older than an hour).
+    """
+    keep = keep or set()
+    templates = _complete_templates()
+    for template_path in templates[settings.FRONTEND_TEMPLATE_KEEP:]:
+        if template_path.name not in keep:
+            shutil.rmtree(template_path, ignore_errors=True)
+            logger.info(f"Removed frontend template {template_path.name[:12]}")
+
+    for path in _store().glob("*.tmp-*"):
+        try:
+            if time.time() - path.stat().st_mtime > 3600:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
@@ -1,57 +1,82 @@
 from langgraph.graph import StateGraph, END
 from app.agent.state import AgentState
-
-# Placeholder Nodes
-def plan_node(state: AgentState):
-    return state
-
-def human_review_node(state: AgentState):
-    return state
-
-def generate_backend_node(state: AgentState):
-    return state
-
-def build_backend_node(state: AgentState):
-    return state
-
-def fix_backend_node(state: AgentState):
-    return state
-
-def extract_openapi_node(state: AgentState):
-    return state
-
-def generate_frontend_node(state: AgentState):
-    return state
+from app.agent.nodes.plan import plan_node
+from app.agent.nodes.human_review import human_review_node
+from app.agent.nodes.backend import generate_backend_node
+from app.agent.nodes.build import build_backend_node
+from app.agent.nodes.fix import fix_backend_node
+from app.agent.nodes.openapi import extract_openapi_node
+from app.agent.nodes.frontend import scaffold_frontend_node, generate_frontend_node
+from app.core.metrics import instrument_node
 
 def final_node(state: AgentState):
     return state
 
+def join_node(state: AgentState):
+    # Waits for both branches; routing happens on the outgoing edge
+    return {}
+
 # Conditional Edges
 def check_approval(state: AgentState):
     if state.get("approved"):
-        return "generate_backend"
+        # Fan out: the backend loop and the frontend scaffold run concurrently
+        return ["backend", "scaffold_frontend"]
     return "human_review"
 
 def check_build_status(state: AgentState):
     if state.get("build_status") == "success":
-        return "extract_openapi"
-    
+        return END
+
     if state.get("retry_count", 0) < state.get("max_retries", 3):
         return "fix_backend"
-    
-    return "final" # Fail gracefully
+
+    return END # Fail gracefully
+
+def check_backend_result(state: AgentState):
+    if state.get("build_status") == "success":
+        return "extract_openapi"
+    return "final"
+
+# Backend generate/build/fix loop. It runs as a single node of the main graph
+# so that it shares one step with scaffold_frontend: LangGraph only starts the
+# next step once every node of the current one has finished, so a chain of
+# backend nodes next to the scaffold node would wait for it at every step.
+backend_workflow = StateGraph(AgentState)
+
+backend_workflow.add_node("generate_backend", instrument_node("generate_backend", generate_backend_node))
+backend_workflow.add_node("build_backend", instrument_node("build_backend", build_backend_node))
+backend_workflow.add_node("fix_backend", instrument_node("fix_backend", fix_backend_node))
+
+backend_workflow.set_entry_point("generate_backend")
+backend_workflow.add_edge("generate_backend", "build_backend")
+
+backend_workflow.add_conditional_edges(
+    "build_backend",
+    check_build_status,
+    {
+        END: END,
+        "fix_backend": "fix_backend"
+    }
+)
+
+backend_workflow.add_edge("fix_backend", "build_backend")
+
+# Inherits the checkpointer of the main graph, so a resumed job continues
+# inside the loop rather than at generate_backend
+backend_graph = backend_workflow.compile()
 
 # Graph Construction
+# Every node is timed (see app/core/metrics.py)
 workflow = StateGraph(AgentState)
 
-workflow.add_node("plan", plan_node)
-workflow.add_node("human_review", human_review_node)
-workflow.add_node("generate_backend", generate_backend_node)
-workflow.add_node("build_backend", build_backend_node)
-workflow.add_node("fix_backend", fix_backend_node)
-workflow.add_node("extract_openapi", extract_openapi_node)
-workflow.add_node("generate_frontend", generate_frontend_node)
-workflow.add_node("final", final_node)
+workflow.add_node("plan", instrument_node("plan", plan_node))
+workflow.add_node("human_review", instrument_node("human_review", human_review_node))
+workflow.add_node("backend", backend_graph)
+workflow.add_node("scaffold_frontend", instrument_node("scaffold_frontend", scaffold_frontend_node))
+workflow.add_node("join", instrument_node("join", join_node))
+workflow.add_node("extract_openapi", instrument_node("extract_openapi", extract_openapi_node))
+workflow.add_node("generate_frontend", instrument_node("generate_frontend", generate_frontend_node))
+workflow.add_node("final", instrument_node("final", final_node))
 
 workflow.set_entry_point("plan")
 
@@ -61,27 +86,25 @@ workflow.add_edge("plan", "human_review")
 workflow.add_conditional_edges(
     "human_review",
     check_approval,
-    {
-        "generate_backend": "generate_backend",
-        "human_review": "human_review"
-    }
+    ["backend", "scaffold_frontend", "human_review"]
 )
 
-workflow.add_edge("generate_backend", "build_backend")
+workflow.add_edge(["backend", "scaffold_frontend"], "join")
 
 workflow.add_conditional_edges(
-    "build_backend",
-    check_build_status,
+    "join",
+    check_backend_result,
     {
         "extract_openapi": "extract_openapi",
-        "fix_backend": "fix_backend",
         "final": "final"
     }
 )
 
-workflow.add_edge("fix_backend", "build_backend")
 workflow.add_edge("extract_openapi", "generate_frontend")
 workflow.add_edge("generate_frontend", "final")
 workflow.add_edge("final", END)
 
-app_graph = workflow.compile()
+def compile_graph(checkpointer=None):
+    return workflow.compile(checkpointer=checkpointer)
+
+app_graph = compile_graph()
@@ -0,0 +1,265 @@
+import ast
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from app.agent.import_graph import python_modules
+from app.agent.process import ProcessResult
+from app.core.config import settings
+from app.core.metrics import record_subprocess
+import logging
+
+logger = logging.getLogger("build")
+
+# Long-lived import checkers, one per project venv.
+#
+# A checker is a `python -B` process in the project venv that imports the
+# project's third party dependencies once and then, for every check, forks
+# a child that imports the project modules (which the checker itself never
+# imports) and reports the outcome over a pipe. A fix iteration therefore
+# only pays for importing the project code, not for interpreter startup
+# and FastAPI/SQLAlchemy/pydantic.
+#
+# A checker is replaced when the venv's requirements change and stopped
+# when the job ends; at most IMPORT_CHECKER_MAX run per worker. Where fork
+# is unavailable, or the checker dies, check_imports returns None and the
+# build node falls back to a one-shot `python -c` import check.
+
+# Requests and responses are JSON lines. The checker's own stdout is
+# moved to a private descriptor so prints during imports cannot corrupt
+# the protocol.
+CHECKER_SCRIPT = """
+import importlib, json, os, sys, traceback
+out = os.fdopen(os.dup(1), "w")
+os.dup2(2, 1)
+sys.path.insert(0, os.getcwd())
+tail = int(sys.argv[1])
+
+def check(modules):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        importlib.invalidate_caches()
+        result = {"ok": True, "error": ""}
+        try:
+            for name in modules:
+                module = importlib.import_module(name)
+                if name == "main":
+                    module.app
+        except BaseException:
+            result = {"ok": False, "error": traceback.format_exc()[-tail:]}
+        with os.fdopen(write_fd, "w") as pipe:
+            json.dump(result, pipe)
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        data = pipe.read()
+    _, status, usage = os.wait4(pid, 0)
+    try:
+        result = json.loads(data)
+    except ValueError:
+        return {"crashed": "import check child exited with status %d" % status}
+    # No peak RSS: a fork's ru_maxrss (and VmHWM) start at the checker's,
+    # preloaded modules included, so they would not measure the import
+    result["cpu"] = usage.ru_utime + usage.ru_stime
+    return result
+
+for line in sys.stdin:
+    request = json.loads(line)
+    for name in request["preload"]:
+        if name not in sys.modules:
+            try:
+                importlib.import_module(name)
+            except BaseException:
+                # The child reports it properly if the project needs it
+                pass
+    out.write(json.dumps(check(request["modules"])) + "\\n")
+    out.flush()
+"""
+
+# Responses carry at most SUBPROCESS_OUTPUT_TAIL_BYTES of traceback
+STREAM_LIMIT = 1024 * 1024
+
+checker_stats: Dict[str, int] = {"started": 0, "checks": 0, "restarts": 0, "fallbacks": 0}
+
+
+def get_checker_stats() -> Dict[str, int]:
+    return dict(checker_stats)
+
+
+def preload_modules(backend_files: Dict[str, dict]) -> List[str]:
+    """
+    Modules the backend imports by absolute name that are not part of the
+    project (third party and standard library).
+    """
+    project_packages = {name.split(".")[0] for name in python_modules(backend_files)}
+    names = set()
+    for file_path, file_state in backend_files.items():
+        if not file_path.endswith(".py"):
+            continue
+        try:
+            tree = ast.parse(file_state.get("content") or "")
+        except SyntaxError:
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names.add(node.module)
+    return sorted(
+        name for name in names
+        if name.split(".")[0] not in project_packages and name != "__future__"
+    )
+
+
+class ImportChecker:
+    def __init__(self, python_executable: Path, backend_path: Path, environment_key: Optional[str]):
+        self.python_executable = python_executable
+        self.backend_path = backend_path
+        self.environment_key = environment_key
+        self.lock = asyncio.Lock()
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            str(self.python_executable), "-B", "-c", CHECKER_SCRIPT, str(settings.SUBPROCESS_OUTPUT_TAIL_BYTES),
+            cwd=str(self.backend_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+            limit=STREAM_LIMIT,
+        )
+        checker_stats["started"] += 1
+        logger.info(f"Started import checker for {self.backend_path} (pid {self.process.pid})")
+
+    async def check(self, modules: List[str], preload: List[str], timeout: float) -> Optional[dict]:
+        """
+        The checker's response, None if the checker died. Raises
+        asyncio.TimeoutError when the imports take longer than timeout.
+        """
+        request = json.dumps({"modules": modules, "preload": preload}) + "\n"
+        try:
+            self.process.stdin.write(request.encode())
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            return None
+        if not line:
+            return None
+        response = json.loads(line)
+        return None if "crashed" in response else response
+
+    def kill(self):
+        if not self.alive:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            # Already gone
+            pass
+
+
+_checkers: "OrderedDict[str, ImportChecker]" = OrderedDict()
+
+
+def _key(backend_path: Path) -> str:
+    return str(backend_path)
+
+
+def discard_checker(user_id: str, project_name: str):
+    checker = _checkers.pop(_key(Path(settings.PROJECTS_DIR) / user_id / project_name / "backend"), None)
+    if checker:
+        checker.kill()
+
+
+def stop_all_checkers():
+    while _checkers:
+        _, checker = _checkers.popitem()
+        checker.kill()
+
+
+async def _get_checker(python_executable: Path, backend_path: Path, environment_key: Optional[str]) -> ImportChecker:
+    key = _key(backend_path)
+    checker = _checkers.get(key)
+    if checker and (checker.environment_key != environment_key or not checker.alive):
+        # New dependencies (or a dead checker): the preloaded modules are stale
+        checker_stats["restarts"] += 1
+        checker.kill()
+        checker = None
+
+    if checker is None:
+        checker = ImportChecker(python_executable, backend_path, environment_key)
+        _checkers[key] = checker
+        while len(_checkers) > settings.IMPORT_CHECKER_MAX:
+            _, oldest = _checkers.popitem(last=False)
+            oldest.kill()
+        await checker.start()
+    _checkers.move_to_end(key)
+    return checker
+
+
+async def check_imports(
+    python_executable: Path,
+    backend_path: Path,
+    modules: List[str],
+    preload: Iterable[str],
+    environment_key: Optional[str],
+) -> Optional[ProcessResult]:
+    """
+    Imports modules in a fork of the project's checker (see above). The
+    result looks like that of the one-shot import check: returncode 0 on
+    success, the traceback on stderr otherwise. None when the checker is
+    unavailable and the caller should run the one-shot check.
+    """
+    if not settings.IMPORT_CHECKER_ENABLED or settings.IMPORT_CHECKER_MAX < 1 or not hasattr(os, "fork"):
+        return None
+
+    start = time.monotonic()
+    try:
+        checker = await _get_checker(python_executable, backend_path, environment_key)
+        async with checker.lock:
+            response = await checker.check(modules, list(preload), settings.IMPORT_CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        _checkers.pop(_key(backend_path), None)
+        checker.kill()
+        wall = time.monotonic() - start
+        record_subprocess("import_check", wall, None, None, 0, 0, "timeout")
+        message = f"Import check timed out after {settings.IMPORT_CHECK_TIMEOUT}s\n"
+        return ProcessResult(returncode=-signal.SIGKILL, stdout=b"", stderr=message.encode(), wall_time=wall, timed_out=True)
+    except Exception as e:
+        logger.warning(f"Import checker failed to start for {backend_path}: {e}")
+        response = None
+
+    if response is None:
+        checker_stats["fallbacks"] += 1
+        discarded = _checkers.pop(_key(backend_path), None)
+        if discarded:
+            discarded.kill()
+        return None
+
+    checker_stats["checks"] += 1
+    wall = time.monotonic() - start
+    stderr = response["error"].encode()
+    record_subprocess(
+        "import_check", wall, response.get("cpu"), None, 0, len(stderr),
+        "ok" if response["ok"] else "error"
+    )
+    return ProcessResult(
+        returncode=0 if response["ok"] else 1,
+        stdout=b"Import successful\n" if response["ok"] else b"",
+        stderr=stderr,
+        wall_time=wall,
+        cpu_time=response.get("cpu"),
+        stderr_bytes=len(stderr),
+    )
@@ -0,0 +1,123 @@
+import ast
+from typing import Dict, Iterable, Optional, Set
+
+# Import graph of the generated backend, computed from the in-memory file
+# contents in AgentState["backend_files"] (paths like "backend/app/main.py").
+
+BACKEND_PREFIX = "backend/"
+
+
+def module_name_for(file_path: str) -> Optional[str]:
+    """
+    Maps "backend/app/models/user.py" to "app.models.user" (and package
+    __init__ files to the package name). Returns None for non-Python files.
+    """
+    if not file_path.endswith(".py"):
+        return None
+
+    rel = file_path[len(BACKEND_PREFIX):] if file_path.startswith(BACKEND_PREFIX) else file_path
+    parts = rel[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return ".".join(parts)
+
+
+def python_modules(backend_files: Dict[str, dict]) -> Dict[str, str]:
+    """
+    Returns {module_name: file_path} for every Python file in state.
+    """
+    modules = {}
+    for file_path in backend_files:
+        name = module_name_for(file_path)
+        if name:
+            modules[name] = file_path
+    return modules
+
+
+def resolve_relative(module_name: str, is_package: bool, level: int, target: Optional[str]) -> str:
+    base = module_name.split(".")
+    if not is_package:
+        base = base[:-1]
+    if level > 1:
+        base = base[:len(base) - (level - 1)]
+    if target:
+        base = base + target.split(".")
+    return ".".join(base)
+
+
+def imported_names(source: str, module_name: str, is_package: bool = False) -> Set[str]:
+    """
+    Every absolute module name referenced by import statements in source,
+    including the candidate submodules of `from x import y`.
+    Raises SyntaxError for unparsable source.
+    """
+    tree = ast.parse(source)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = resolve_relative(module_name, is_package, node.level, node.module)
+            else:
+                base = node.module or ""
+            if base:
+                names.add(base)
+            for alias in node.names:
+                if alias.name != "*":
+                    names.add(f"{base}.{alias.name}" if base else alias.name)
+    return names
+
+
+def local_imports(source: str, module_name: str, known_modules: Iterable[str], is_package: bool = False) -> Set[str]:
+    """
+    The project modules (from known_modules) that source imports, including
+    parent packages whose __init__ runs as a side effect.
+    """
+    known = set(known_modules)
+    result = set()
+    for name in imported_names(source, module_name, is_package):
+        parts = name.split(".")
+        for i in range(1, len(parts) + 1):
+            candidate = ".".join(parts[:i])
+            if candidate in known and candidate != module_name:
+                result.add(candidate)
+    return result
+
+
+def build_import_graph(backend_files: Dict[str, dict]) -> Dict[str, Set[str]]:
+    """
+    {module: set of local modules it imports}. Files that do not parse get
+    an empty edge set (their syntax error surfaces when they are checked).
+    """
+    modules = python_modules(backend_files)
+    graph = {}
+    for name, file_path in modules.items():
+        is_package = file_path.endswith("__init__.py")
+        try:
+            graph[name] = local_imports(backend_files[file_path].get("content") or "", name, modules, is_package)
+        except SyntaxError:
+            graph[name] = set()
+    return graph
+
+
+def dependents_closure(graph: Dict[str, Set[str]], changed: Iterable[str]) -> Set[str]:
+    """
+    changed plus every module that (transitively) imports one of them.
+    """
+    reverse: Dict[str, Set[str]] = {name: set() for name in graph}
+    for name, imports in graph.items():
+        for imported in imports:
+            reverse.setdefault(imported, set()).add(name)
+
+    affected = set(changed)
+    stack = list(affected)
+    while stack:
+        for importer in reverse.get(stack.pop(), ()):
+            if importer not in affected:
+                affected.add(importer)
+                stack.append(importer)
+    return affected
@@ -0,0 +1,63 @@
+import json
+from typing import Any, List
+
+class JsonArrayItemParser:
+    """
+    Incremental parser for streamed JSON of the form {"files": [{...}, {...}]}.
+
+    Text is fed in arbitrary chunks; every object that sits directly inside
+    an array of the top-level object is returned by feed() as soon as its
+    closing brace arrives. Only the bytes of the item currently being
+    received are kept in memory.
+    """
+
+    # depth 1 is the top-level object, depth 2 the array, depth 3 an item
+    ITEM_DEPTH = 3
+
+    def __init__(self):
+        self._buffer = ""
+        self._item_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._containers: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        items = []
+        offset = len(self._buffer)
+        self._buffer += chunk
+
+        for i in range(offset, len(self._buffer)):
+            char = self._buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._containers.append(char)
+                self._depth += 1
+                if self._depth == self.ITEM_DEPTH and char == "{" and self._containers[-2] == "[":
+                    self._item_start = i
+            elif char in "}]":
+                if self._depth == self.ITEM_DEPTH and self._item_start is not None:
+                    items.append(json.loads(self._buffer[self._item_start:i + 1]))
+                    self._item_start = None
+                self._containers.pop()
+                self._depth -= 1
+
+        # Nothing outside the item in progress needs to be kept around
+        if self._item_start is None:
+            self._buffer = ""
+        elif self._item_start > 0:
+            self._buffer = self._buffer[self._item_start:]
+            self._item_start = 0
+
+        return items
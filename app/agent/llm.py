@@ -1,8 +1,13 @@
 import os
+import time
+from typing import AsyncIterator
 from google import genai
 from google.genai import types
 from app.core.config import settings
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from app.agent import llm_cache
+from app.agent.json_stream import JsonArrayItemParser
+from app.core.metrics import record_llm_call
 import logging
 from fastapi import HTTPException, status
 
@@ -27,21 +32,47 @@ def get_model(model_name: str = "gemini-3-flash-preview"):
     
 #     return response.text
 
-async def generate_structured_content(prompt: str, response_schema: type[BaseModel], model_name: str = "gemini-3-flash-preview"):
+SYSTEM_INSTRUCTION = "You are a JSON generator. Output only the JSON requested"
+
+async def generate_structured_content(prompt: str, response_schema: type[BaseModel], model_name: str = "gemini-3-flash-preview", use_cache: bool = True):
     """
     Generates structured content using the specific pattern for gemini-3-flash-preview.
+    Identical (model, system instruction, prompt, schema) requests are served from
+    the LLM cache unless use_cache is False.
     """
+    use_cache = use_cache and settings.LLM_CACHE_ENABLED
+    cache_key = None
+    schema_name = response_schema.__name__
+    start = time.monotonic()
+
+    if use_cache:
+        cache_key = llm_cache.make_key(model_name, SYSTEM_INSTRUCTION, prompt, response_schema.model_json_schema())
+        cached_text = await llm_cache.lookup(cache_key)
+        if cached_text is not None:
+            try:
+                logger.info(f"LLM cache hit ({schema_name})")
+                parsed = response_schema.model_validate_json(cached_text)
+                record_llm_call(schema_name, model_name, "cache", time.monotonic() - start)
+                return parsed
+            except ValidationError:
+                logger.warning("Discarding cached LLM response that no longer matches its schema")
+
     try:
         response = await google_gemini_client.aio.models.generate_content(
             model=model_name,
             contents=prompt,
             config=types.GenerateContentConfig(
-                system_instruction="You are a JSON generator. Output only the JSON requested",
+                system_instruction=SYSTEM_INSTRUCTION,
                 response_mime_type="application/json",
                 response_schema=response_schema,
             )
         )
 
+        record_llm_call(schema_name, model_name, "api", time.monotonic() - start, response.usage_metadata)
+
+        if use_cache and response.parsed is not None and response.text:
+            await llm_cache.store(cache_key, response.text, model_name)
+
         return response.parsed
     
     except Exception as e:
@@ -50,3 +81,77 @@ async def generate_structured_content(prompt: str, response_schema: type[BaseMod
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unable to generate structered content from gemini api"
         )
+
+async def generate_structured_stream(
+    prompt: str,
+    response_schema: type[BaseModel],
+    item_schema: type[BaseModel],
+    model_name: str = "gemini-3-flash-preview",
+    use_cache: bool = True,
+) -> AsyncIterator[BaseModel]:
+    """
+    Streaming variant of generate_structured_content for list-shaped schemas
+    (e.g. {"files": [...]}). Yields each list item as an item_schema instance
+    as soon as its JSON object is complete.
+    """
+    use_cache = use_cache and settings.LLM_CACHE_ENABLED
+    cache_key = None
+    schema_name = response_schema.__name__
+    start = time.monotonic()
+
+    if use_cache:
+        cache_key = llm_cache.make_key(model_name, SYSTEM_INSTRUCTION, prompt, response_schema.model_json_schema())
+        cached_text = await llm_cache.lookup(cache_key)
+        if cached_text is not None:
+            try:
+                response_schema.model_validate_json(cached_text)
+                logger.info(f"LLM cache hit ({schema_name}, streamed)")
+                record_llm_call(schema_name, model_name, "cache", time.monotonic() - start)
+                for item in JsonArrayItemParser().feed(cached_text):
+                    yield item_schema.model_validate(item)
+                return
+            except ValidationError:
+                logger.warning("Discarding cached LLM response that no longer matches its schema")
+
+    parser = JsonArrayItemParser()
+    chunks = []
+    usage = None
+
+    try:
+        stream = await google_gemini_client.aio.models.generate_content_stream(
+            model=model_name,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+            )
+        )
+
+        async for chunk in stream:
+            # Usage is reported cumulatively, the last chunk has the totals
+            usage = chunk.usage_metadata or usage
+            text = chunk.text
+            if not text:
+                continue
+            chunks.append(text)
+            for item in parser.feed(text):
+                yield item_schema.model_validate(item)
+
+    except Exception as e:
+        logger.error(f"LLM Streaming Error: str({e})")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to stream structered content from gemini api"
+        )
+
+    # Includes the time the caller spent between items
+    record_llm_call(schema_name, model_name, "api", time.monotonic() - start, usage)
+
+    if use_cache:
+        full_text = "".join(chunks)
+        try:
+            response_schema.model_validate_json(full_text)
+            await llm_cache.store(cache_key, full_text, model_name)
+        except ValidationError:
+            logger.warning("Streamed LLM response did not match its schema, not caching")
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+from app.core.config import settings
+from app.core.metrics import record_cache_event
+
+logger = logging.getLogger("agent")
+
+# Two tier cache for LLM responses.
+#
+# Tier 1 is an in-process LRU with TTL. Tier 2 is a directory of JSON files
+# under settings.LLM_CACHE_DIR shared by every worker on the host; file mtime
+# doubles as the LRU timestamp for size-bounded eviction. Values are the raw
+# response text so callers re-validate them against their own schema.
+
+# Also exported as agent_cache_events_total{cache="llm"}
+cache_stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+_memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+_EVICT_EVERY = 50
+_stores_since_evict = 0
+
+
+def make_key(model_name: str, system_instruction: str, prompt: str, schema: Optional[dict]) -> str:
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "system_instruction": system_instruction,
+            "prompt": prompt,
+            "schema": schema
+        },
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _count(event: str):
+    cache_stats[event] += 1
+    record_cache_event("llm", event)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return {**cache_stats, "memory_entries": len(_memory)}
+
+
+def _disk_path(key: str) -> Path:
+    return Path(settings.LLM_CACHE_DIR) / key[:2] / f"{key}.json"
+
+
+def _memory_get(key: str) -> Optional[str]:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+
+    expires_at, text = entry
+    if expires_at < time.time():
+        _memory.pop(key, None)
+        return None
+
+    _memory.move_to_end(key)
+    return text
+
+
+def _memory_set(key: str, text: str, expires_at: float):
+    _memory[key] = (expires_at, text)
+    _memory.move_to_end(key)
+    while len(_memory) > settings.LLM_CACHE_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def _disk_get(key: str) -> Optional[Tuple[float, str]]:
+    path = _disk_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    expires_at = entry.get("created_at", 0) + settings.LLM_CACHE_TTL
+    if expires_at < time.time():
+        path.unlink(missing_ok=True)
+        return None
+
+    # Touch so eviction treats it as recently used
+    os.utime(path)
+    return expires_at, entry["text"]
+
+
+def _disk_set(key: str, text: str, model_name: str):
+    path = _disk_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".tmp-{uuid4().hex[:8]}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.time(), "model": model_name, "text": text}, f)
+    os.replace(tmp_path, path)
+
+
+def evict_disk():
+    """
+    Deletes least recently used entries until the disk tier fits in
+    settings.LLM_CACHE_MAX_BYTES.
+    """
+    root = Path(settings.LLM_CACHE_DIR)
+    if not root.exists():
+        return
+
+    entries = []
+    total = 0
+    for path in root.glob("*/*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= settings.LLM_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        _count("evictions")
+
+
+async def lookup(key: str) -> Optional[str]:
+    text = _memory_get(key)
+    if text is not None:
+        _count("memory_hits")
+        return text
+
+    try:
+        entry = await asyncio.to_thread(_disk_get, key)
+    except Exception as e:
+        logger.warning(f"LLM cache read failed: {e}")
+        entry = None
+
+    if entry is not None:
+        expires_at, text = entry
+        _count("disk_hits")
+        _memory_set(key, text, expires_at)
+        return text
+
+    _count("misses")
+    return None
+
+
+async def store(key: str, text: str, model_name: str):
+    global _stores_since_evict
+
+    _memory_set(key, text, time.time() + settings.LLM_CACHE_TTL)
+    _count("stores")
+
+    try:
+        await asyncio.to_thread(_disk_set, key, text, model_name)
+        _stores_since_evict += 1
+        if _stores_since_evict >= _EVICT_EVERY:
+            _stores_since_evict = 0
+            await asyncio.to_thread(evict_disk)
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {e}")
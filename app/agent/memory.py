@@ -1,68 +1,123 @@
 import logging
 import hashlib
+import re
+from collections import OrderedDict
 from typing import Optional, Tuple
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, text
 from pgvector.sqlalchemy import Vector
-from sentence_transformers import SentenceTransformer
 from app.agent.llm import get_model
+from app.agent.embeddings import embedding_service
 from app.models.error_memory import ErrorMemory
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal
+from app.db.vector_index import search_settings_statements
+from app.core.config import settings
 
 logger = logging.getLogger("agent")
 
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# need to use a local embedding model and not this one
 async def get_embedding(text: str) -> list[float]:
-    embeddings = embedding_model.encode(text)
-    
-    return embeddings
+    # Encoded in a thread pool and batched with concurrent callers
+    return await embedding_service.embed(text)
 
 def calculate_hash(text: str) -> str:
     return hashlib.sha256(text.encode()).hexdigest()
 
+_PATH_RE = re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-@+]+)+[\\/]([\w.\-]+)")
+_LINE_RE = re.compile(r"\bline \d+")
+_POSITION_RE = re.compile(r":\d+(?::\d+)?\b")
+_ADDRESS_RE = re.compile(r"\b0x[0-9a-fA-F]+\b")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+def normalize_error(error_summary: str) -> str:
+    """
+    Removes the parts of an error that differ between otherwise identical
+    failures: directory prefixes, line/column numbers and memory addresses.
+    """
+    normalized = _PATH_RE.sub(r"\1", error_summary)
+    normalized = _LINE_RE.sub("line N", normalized)
+    normalized = _POSITION_RE.sub(":N", normalized)
+    normalized = _ADDRESS_RE.sub("0xADDR", normalized)
+    normalized = _SPACES_RE.sub(" ", normalized)
+    return "\n".join(line.strip() for line in normalized.strip().splitlines() if line.strip())
+
+def error_memory_key(error_summary: str) -> str:
+    return calculate_hash(normalize_error(error_summary))
+
+# normalized error hash -> (file_path, corrected_code)
+_recent_fixes: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+def _remember_fix(error_hash: str, file_path: str, corrected_code: str):
+    _recent_fixes[error_hash] = (file_path, corrected_code)
+    _recent_fixes.move_to_end(error_hash)
+    while len(_recent_fixes) > settings.ERROR_MEMORY_LRU_SIZE:
+        _recent_fixes.popitem(last=False)
+
+def _recent_fix(error_hash: str, error_summary: str) -> Optional[ErrorMemory]:
+    entry = _recent_fixes.get(error_hash)
+    if entry is None:
+        return None
+    _recent_fixes.move_to_end(error_hash)
+    file_path, corrected_code = entry
+    # Transient instance; callers only read file_path / corrected_code
+    return ErrorMemory(
+        error_hash=error_hash,
+        error_summary=error_summary,
+        file_path=file_path,
+        corrected_code=corrected_code
+    )
+
 async def find_similar_error(error_summary: str, threshold: float = 0.85) -> Optional[ErrorMemory]:
+    error_hash = error_memory_key(error_summary)
+
+    # 1. Recently seen identical error (after normalization)
+    memory = _recent_fix(error_hash, error_summary)
+    if memory:
+        logger.info("Found error memory in process cache.")
+        return memory
+
     try:
+        async with AsyncSessionLocal() as db:
+            # 2. Exact match on the normalized hash, no embedding needed
+            memory = (await db.execute(
+                select(ErrorMemory)
+                .where(ErrorMemory.error_hash == error_hash)
+                .order_by(ErrorMemory.created_at.desc())
+                .limit(1)
+            )).scalars().first()
+            if memory:
+                logger.info("Found error memory by exact hash.")
+                _remember_fix(error_hash, memory.file_path, memory.corrected_code)
+                return memory
+
+        # 3. Semantic match
         embedding = await get_embedding(error_summary)
-        
-        db: Session = SessionLocal()
-        try:
-            # Cosine distance: <=> operator in pgvector is cosine distance (1 - cosine similarity)
-            # So similarity >= 0.85 means distance <= 0.15
-            # Wait, typically we select by distance and filter.
-            # pgvector: <-> is L2, <=> is cosine distance, <#> is inner product.
-            # Cosine distance range [0, 2]. 0 is identical.
-            # Convert threshold: distance <= 1 - 0.85 = 0.15
-            
+
+        async with AsyncSessionLocal() as db:
+            # pgvector's <=> is cosine distance (1 - cosine similarity), so
+            # similarity >= threshold means distance <= 1 - threshold. The
+            # threshold is applied in SQL and ORDER BY distance LIMIT 1 lets
+            # the HNSW/IVFFlat index drive the scan.
             target_distance = 1 - threshold
-            
-            stmt = select(ErrorMemory).order_by(
-                ErrorMemory.embedding.cosine_distance(embedding)
-            ).limit(1)
-            
-            result = db.execute(stmt).scalars().first()
-            
-            if result:
-                 # Check the actual distance if needed, or trust the order_by + limit logic isn't enough?
-                 # We need to filter by distance.
-                 # SQLAlchemy doesn't return the distance easily unless we select it.
-                 pass
-            
-            # Better query to get distance
-            stmt = select(ErrorMemory, ErrorMemory.embedding.cosine_distance(embedding).label("distance")) \
-                   .order_by("distance").limit(1)
-            
-            res = db.execute(stmt).first()
+            distance = ErrorMemory.embedding.cosine_distance(embedding)
+
+            # SET LOCAL needs the search to run in the same transaction
+            async with db.begin():
+                for statement in search_settings_statements():
+                    await db.execute(text(statement))
+
+                stmt = select(ErrorMemory, distance.label("distance")) \
+                       .where(distance <= target_distance) \
+                       .order_by(distance) \
+                       .limit(1)
+
+                res = (await db.execute(stmt)).first()
+
             if res:
                 memory, distance = res
-                if distance <= target_distance:
-                    logger.info(f"Found similar error memory. Distance: {distance}")
-                    return memory
+                logger.info(f"Found similar error memory. Distance: {distance}")
+                _remember_fix(error_hash, memory.file_path, memory.corrected_code)
+                return memory
             
             return None
-        finally:
-            db.close()
             
     except Exception as e:
         logger.error(f"Error finding similar memory: {e}")
@@ -71,10 +126,10 @@ async def find_similar_error(error_summary: str, threshold: float = 0.85) -> Opt
 async def store_error_memory(error_summary: str, file_path: str, corrected_code: str):
     try:
         embedding = await get_embedding(error_summary)
-        error_hash = calculate_hash(error_summary)
+        error_hash = error_memory_key(error_summary)
+        _remember_fix(error_hash, file_path, corrected_code)
         
-        db: Session = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             memory = ErrorMemory(
                 error_hash=error_hash,
                 error_summary=error_summary,
@@ -83,9 +138,7 @@ async def store_error_memory(error_summary: str, file_path: str, corrected_code:
                 embedding=embedding
             )
             db.add(memory)
-            db.commit()
+            await db.commit()
             logger.info("Stored error memory.")
-        finally:
-            db.close()
     except Exception as e:
         logger.error(f"Error storing memory: {e}")
@@ -1,10 +1,13 @@
 import asyncio
-from app.agent.state import AgentState
-from app.agent.llm import generate_structured_content
-from app.agent.schemas import FileGeneration
-from app.agent.utils import write_file
+from app.agent.state import AgentState, FileState
+from app.agent.llm import generate_structured_content, generate_structured_stream
+from app.agent.schemas import FileGeneration, BackendContract
+from app.agent.utils import write_file, write_files
+from app.agent.speculative_install import start_speculative_install, requirements_from_plan
+from app.core.config import settings
 import logging
-from typing import List
+from pathlib import PurePosixPath
+from typing import List, Dict
 from pydantic import BaseModel
 
 logger = logging.getLogger("agent")
@@ -12,55 +15,273 @@ logger = logging.getLogger("agent")
 class FileList(BaseModel):
     files: List[FileGeneration]
 
+# Files that are expected in every backend even if the plan forgets them
+REQUIRED_BACKEND_FILES = ["requirements.txt", "main.py"]
+
+def _strip_relative_prefix(file_path: str) -> str:
+    file_path = file_path.strip()
+    while file_path.startswith("./"):
+        file_path = file_path[2:]
+    return file_path.lstrip("/")
+
+def normalize_backend_path(file_path: str) -> str:
+    path = f"backend/{_strip_relative_prefix(file_path)}"
+
+    if "backend/backend/" in path:
+        path = path.replace("backend/backend/", "backend/")
+
+    return path
+
+def _generated_file_state(path: str, code: str, content_hash: str) -> FileState:
+    return {
+        "file_path": path,
+        "content": code,
+        "status": "generated",
+        "retry_count": 0,
+        "last_error": None,
+        "content_hash": content_hash,
+        "source": "llm"
+    }
+
+async def _write_backend_file(state: AgentState, path: str, code: str) -> str:
+    content_hash = await write_file(path, code, state['project_name'], state['user_id'])
+
+    # Dependency install can start while the rest of the code is generated
+    if path == "backend/requirements.txt":
+        start_speculative_install(state['user_id'], state['project_name'], code)
+
+    return content_hash
+
+async def _write_backend_files(state: AgentState, files: Dict[str, str]) -> Dict[str, str]:
+    """{path: content} -> {path: content_hash}, written in one batch."""
+    hashes = await write_files(files, state['project_name'], state['user_id'])
+
+    if "backend/requirements.txt" in files:
+        start_speculative_install(state['user_id'], state['project_name'], files["backend/requirements.txt"])
+
+    return hashes
+
+def planned_backend_files(state: AgentState) -> List[str]:
+    """
+    Returns the file paths (relative to backend/) listed in the plan's
+    backend_structure, skipping directory entries.
+    """
+    plan = state.get("project_plan") or {}
+    files = []
+    for entry in plan.get("backend_structure") or []:
+        entry = _strip_relative_prefix(entry)
+        if entry.startswith("backend/"):
+            entry = entry[len("backend/"):]
+        if not entry or entry.endswith("/"):
+            continue
+        name = PurePosixPath(entry).name
+        if "." not in name and name not in ("Dockerfile", "Procfile"):
+            continue
+        if entry not in files:
+            files.append(entry)
+
+    for required in REQUIRED_BACKEND_FILES:
+        if required not in files:
+            files.append(required)
+
+    return files
+
 async def generate_backend_node(state: AgentState):
     logger.info("Generating backend code...")
-    
-    prompt = f"""
+
+    planned_files = planned_backend_files(state)
+
+    # Most of the dependency set is known from the plan before any code exists
+    start_speculative_install(state['user_id'], state['project_name'], requirements_from_plan(state))
+
+    if settings.BACKEND_GENERATION_MODE == "parallel" and len(planned_files) > len(REQUIRED_BACKEND_FILES):
+        return await _generate_backend_parallel(state, planned_files)
+
+    if settings.BACKEND_GENERATION_MODE == "stream":
+        return await _generate_backend_stream(state)
+
+    return await _generate_backend_single(state)
+
+def _single_prompt(state: AgentState) -> str:
+    return f"""
     Generate the backend code for: {state['project_name']}
-    
+
     PLAN:
     {state['project_plan_markdown']}
-    
+
     Generate all necessary files based on this plan.
     Ensure 'requirements.txt' is included.
     Ensure 'main.py' is included.
     Ensure database configuration is included.
-    
+
     Return a list of files with their content.
     """
-    
+
+async def _generate_backend_single(state: AgentState):
+    prompt = _single_prompt(state)
+
     try:
-        response_text = await generate_structured_content(prompt, FileList, model_name="gemini-3-flash-preview")
-        import json
-        data = json.loads(response_text)
-        files = data.get("files", [])
-        
+        file_list: FileList = await generate_structured_content(prompt, FileList, model_name="gemini-3-flash-preview")
+        files = file_list.files
+
         generated_files = state.get("backend_files", {})
-        
-        for file in files:
-            path = f"backend/{file['file_path']}" 
-
-            if "backend/backend/" in path:
-                path = path.replace("backend/backend/", "backend/")
-            
-            await write_file(path, file['code'], state['project_name'], state['user_id'])
-            
-            generated_files[path] = {
-                "file_path": path,
-                "content": file['code'],
-                "status": "generated",
-                "retry_count": 0,
-                "last_error": None,
-                "content_hash": None,
-                "source": "llm"
-            }
-            
+
+        contents = {normalize_backend_path(file.file_path): file.code for file in files}
+        hashes = await _write_backend_files(state, contents)
+
+        for path, code in contents.items():
+            generated_files[path] = _generated_file_state(path, code, hashes[path])
+
+        state["backend_files"] = generated_files
+        state["build_status"] = "pending"
+
+        return state
+
+    except Exception as e:
+        logger.error(f"Backend generation failed: {e}")
+        state["error_message"] = str(e)
+        return state
+
+async def _generate_backend_stream(state: AgentState):
+    prompt = _single_prompt(state)
+    generated_files = state.get("backend_files", {})
+
+    try:
+        # Each file is written as soon as its JSON object is complete
+        async for file in generate_structured_stream(prompt, FileList, FileGeneration, model_name="gemini-3-flash-preview"):
+            path = normalize_backend_path(file.file_path)
+
+            content_hash = await _write_backend_file(state, path, file.code)
+
+            generated_files[path] = _generated_file_state(path, file.code, content_hash)
+
         state["backend_files"] = generated_files
         state["build_status"] = "pending"
-        
+
         return state
 
     except Exception as e:
         logger.error(f"Backend generation failed: {e}")
+        state["backend_files"] = generated_files
         state["error_message"] = str(e)
         return state
+
+def _render_contract(contract: BackendContract) -> str:
+    lines = []
+    for module in contract.modules:
+        lines.append(f"- {module.file_path}: {module.purpose}")
+        if module.exports:
+            lines.append(f"    exports: {', '.join(module.exports)}")
+        if module.imports_from:
+            lines.append(f"    imports from: {', '.join(module.imports_from)}")
+    return "\n".join(lines)
+
+async def _build_shared_context(state: AgentState, planned_files: List[str]) -> str:
+    """
+    Agrees on each module's public names up front so files generated in
+    isolation still import each other correctly.
+    """
+    file_tree = "\n".join(f"- {f}" for f in planned_files)
+    context = f"""
+    PLAN:
+    {state['project_plan_markdown']}
+
+    BACKEND FILES (paths relative to the backend root, which is the working directory):
+    {file_tree}
+    """
+
+    prompt = f"""
+    You are designing the module interfaces for the backend of: {state['project_name']}
+    {context}
+    For every file above, give its purpose, the exact top-level names it exports
+    (classes, functions, router/app objects, settings objects) and which of the
+    other listed files it imports from. Use absolute imports relative to the
+    backend root (e.g. 'from app.models.user import User'). For requirements.txt
+    list the packages as exports.
+    """
+
+    try:
+        contract: BackendContract = await generate_structured_content(prompt, BackendContract)
+        return context + "\n    MODULE CONTRACT (must be followed exactly):\n" + _render_contract(contract)
+    except Exception as e:
+        # Still usable without the contract, imports are just less reliable
+        logger.warning(f"Backend contract generation failed, continuing with plan only: {e}")
+        return context
+
+async def _generate_file_group(
+    group: List[str],
+    shared_context: str,
+    state: AgentState,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, FileState]:
+    prompt = f"""
+    Generate backend code for: {state['project_name']}
+    {shared_context}
+
+    Generate ONLY these files, complete and ready to run:
+    {chr(10).join(f"- {f}" for f in group)}
+
+    Import other project modules exactly as described in the module contract.
+    requirements.txt must list every third party package used by any file above.
+    Return a list of files with their content.
+    """
+
+    expected = {normalize_backend_path(f) for f in group}
+
+    async with semaphore:
+        file_list: FileList = await generate_structured_content(prompt, FileList, model_name="gemini-3-flash-preview")
+
+    contents: Dict[str, str] = {}
+    for file in file_list.files:
+        path = normalize_backend_path(file.file_path)
+        if path not in expected:
+            # Another group owns this file; writing it here would race with that group
+            logger.warning(f"Ignoring unrequested file {path} from group {group}")
+            continue
+        contents[path] = file.code
+
+    hashes = await _write_backend_files(state, contents)
+    written: Dict[str, FileState] = {
+        path: _generated_file_state(path, code, hashes[path]) for path, code in contents.items()
+    }
+
+    missing = expected - set(written)
+    if missing:
+        logger.warning(f"Generation did not return {sorted(missing)}")
+
+    return written
+
+async def _generate_backend_parallel(state: AgentState, planned_files: List[str]):
+    group_size = max(1, settings.BACKEND_GENERATION_GROUP_SIZE)
+    groups = [planned_files[i:i + group_size] for i in range(0, len(planned_files), group_size)]
+    logger.info(
+        f"Generating {len(planned_files)} backend files in {len(groups)} groups "
+        f"(concurrency {settings.BACKEND_GENERATION_CONCURRENCY})"
+    )
+
+    shared_context = await _build_shared_context(state, planned_files)
+    semaphore = asyncio.Semaphore(max(1, settings.BACKEND_GENERATION_CONCURRENCY))
+
+    generated_files = state.get("backend_files", {})
+    failures = []
+
+    tasks = [
+        asyncio.create_task(_generate_file_group(group, shared_context, state, semaphore))
+        for group in groups
+    ]
+
+    # Files are already on disk when each group finishes; this only collects state
+    for task in asyncio.as_completed(tasks):
+        try:
+            generated_files.update(await task)
+        except Exception as e:
+            logger.error(f"Backend file group generation failed: {e}")
+            failures.append(str(e))
+
+    state["backend_files"] = generated_files
+    state["build_status"] = "pending"
+
+    if failures:
+        state["error_message"] = f"{len(failures)} of {len(groups)} backend file groups failed: {failures[0]}"
+
+    return state
@@ -1,14 +1,62 @@
-import asyncio
-import subprocess
 import os
 import sys
 from app.agent.state import AgentState
+from app.agent import sandbox_pool, import_checker
+from app.agent.speculative_install import wait_for_speculative_install
+from app.agent.import_graph import python_modules, build_import_graph, dependents_closure
+from app.agent.utils import hash_content
+from app.agent.traceback_analyzer import analyze_traceback
+from app.agent.static_check import check_backend, format_diagnostics
+from app.agent.process import run_process
 from app.core.config import settings
 import logging
 from pathlib import Path
 
 logger = logging.getLogger("build")
 
+# Imports each module given on the command line; "main" must expose `app`.
+# Any failure propagates so the traceback lands on stderr.
+IMPORT_CHECK_SCRIPT = """
+import importlib, sys
+for name in sys.argv[1:]:
+    module = importlib.import_module(name)
+    if name == "main":
+        module.app
+print("Import successful")
+"""
+
+def modules_needing_validation(backend_files: dict, validated_hashes: dict) -> list:
+    """
+    Modules whose content hash differs from the last successful import check,
+    plus every module importing them. "main" is checked last.
+    """
+    modules = python_modules(backend_files)
+    if "main" not in modules:
+        # Nothing to reason about (e.g. state lost the files); check the app entrypoint
+        return ["main"]
+
+    changed = {
+        name for name, path in modules.items()
+        if not backend_files[path].get("content_hash")
+        or validated_hashes.get(path) != backend_files[path]["content_hash"]
+    }
+    affected = dependents_closure(build_import_graph(backend_files), changed)
+
+    ordered = sorted(affected - {"main"})
+    if "main" in affected:
+        ordered.append("main")
+    return ordered
+
+def record_build_failure(state: AgentState, error_msg: str):
+    state["build_status"] = "failed"
+    state["error_message"] = error_msg
+    state["retry_count"] = state.get("retry_count", 0) + 1
+    # The parsed exception and frames first: the tail alone can cut
+    # off the project frames of a long traceback
+    analysis = analyze_traceback(error_msg)
+    summary = error_msg[-2000:]
+    state["error_summary"] = f"{analysis.describe()}\n\n{summary}" if analysis else summary
+
 async def build_backend_node(state: AgentState):
     logger.info("Building/Testing backend...")
     
@@ -20,61 +68,81 @@ async def build_backend_node(state: AgentState):
     # Windows paths
     if os.name == 'nt':
         python_executable = venv_path / "Scripts" / "python.exe"
-        pip_executable = venv_path / "Scripts" / "pip.exe"
     else:
         python_executable = venv_path / "bin" / "python"
-        pip_executable = venv_path / "bin" / "pip"
 
     try:
-        # 1. Create Virtual Env
-        if not venv_path.exists():
-            logger.info("Creating virtual environment...")
-            proc = await asyncio.create_subprocess_exec(
-                sys.executable, "-m", "venv", str(venv_path),
-                cwd=str(backend_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await proc.communicate()
-            if proc.returncode != 0:
-                raise Exception("Failed to create venv")
-
-        # 2. Install Requirements
         req_file = backend_path / "requirements.txt"
+        backend_files = state.get("backend_files", {})
+
+        # Syntax errors and broken project imports need neither the venv nor
+        # a subprocess to find
+        diagnostics = check_backend(backend_files, project_root)
+        if diagnostics:
+            error_msg = format_diagnostics(diagnostics)
+            logger.error(f"Backend static check failed: {error_msg}")
+            record_build_failure(state, error_msg)
+            return state
+
+        # Installs started during code generation may still be running
+        await wait_for_speculative_install(state['user_id'], state['project_name'])
+
         if req_file.exists():
-            logger.info("Installing requirements...")
-            proc = await asyncio.create_subprocess_exec(
-                str(python_executable), "-m", "pip", "install", "-r", "requirements.txt",
-                cwd=str(backend_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            out, err = await proc.communicate()
-            if proc.returncode != 0:
-                logger.error(f"Pip install failed: {err.decode()}")
-                raise Exception(f"Pip install failed: {err.decode()[-500:]}")
+            requirements_text = req_file.read_text(encoding="utf-8")
+            requirements_hash = hash_content(requirements_text)
+
+            if requirements_hash == state.get("requirements_hash") and python_executable.exists():
+                logger.info("Requirements unchanged, skipping dependency installation")
+            else:
+                # 1+2. Create the venv / install requirements, or just the delta
+                # if a speculative install or a pooled sandbox already populated it
+                logger.info("Syncing build environment...")
+                await sandbox_pool.provision_environment(venv_path, requirements_text)
+                state["requirements_hash"] = requirements_hash
+                # New dependencies can break modules that imported fine before
+                state["validated_hashes"] = {}
+        elif not venv_path.exists():
+            logger.info("Creating virtual environment...")
+            result = await run_process(sys.executable, "-m", "venv", str(venv_path), cwd=backend_path)
+            if result.returncode != 0:
+                raise Exception("Failed to create venv")
         
-        # 3. Dry Run / Import Check (to ensure we can run uvicorn later)
-        logger.info("Verifying backend imports...")
-        proc = await asyncio.create_subprocess_exec(
-            str(python_executable), "-c", "from main import app; print('Import successful')",
-            cwd=str(backend_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        # 3. Dry Run / Import Check (to ensure we can run uvicorn later),
+        # limited to modules that changed since the last successful check
+        # and the modules importing them
+        modules_to_check = modules_needing_validation(backend_files, state.get("validated_hashes") or {})
+        if not modules_to_check:
+            logger.info("No modules changed since the last successful import check.")
+            state["build_status"] = "success"
+            state["error_summary"] = None
+            return state
+
+        logger.info(f"Verifying backend imports ({len(modules_to_check)} modules)...")
+        result = await import_checker.check_imports(
+            python_executable, backend_path, modules_to_check,
+            import_checker.preload_modules(backend_files), state.get("requirements_hash")
         )
-        out, err = await proc.communicate()
+        if result is None:
+            result = await run_process(
+                python_executable, "-c", IMPORT_CHECK_SCRIPT, *modules_to_check,
+                cwd=backend_path,
+                timeout=settings.IMPORT_CHECK_TIMEOUT,
+                label="import_check"
+            )
         
-        if proc.returncode == 0:
+        if result.returncode == 0:
             logger.info("Backend build successful.")
             state["build_status"] = "success"
             state["error_summary"] = None
+            state["validated_hashes"] = {
+                path: file_state["content_hash"]
+                for path, file_state in backend_files.items()
+                if path.endswith(".py") and file_state.get("content_hash")
+            }
         else:
-            error_msg = err.decode()
+            error_msg = result.stderr.decode(errors="replace")
             logger.error(f"Backend verification failed: {error_msg}")
-            state["build_status"] = "failed"
-            state["error_message"] = error_msg
-            state["retry_count"] = state.get("retry_count", 0) + 1
-            state["error_summary"] = error_msg[-2000:]
+            record_build_failure(state, error_msg)
 
     except Exception as e:
         logger.error(f"Build process error: {e}")
@@ -1,71 +1,213 @@
 from app.agent.state import AgentState
 from app.agent.llm import generate_structured_content
-from app.agent.schemas import ErrorFixResponse
-from app.agent.utils import write_file, read_file
-from app.agent.memory import find_similar_error, store_error_memory
+from app.agent.schemas import PatchFixResponse
+from app.agent.utils import write_file, write_files, read_file
+from app.agent.memory import find_similar_error, store_error_memory, error_memory_key
+from app.agent.patches import PatchConflict, apply_edits, normalize_path
+from app.agent.traceback_analyzer import TracebackAnalysis, analyze_traceback
+from app.agent.quick_fixes import REQUIREMENTS_FILE, quick_fix
 import logging
-import re
-import json
+from typing import Dict, List, Optional
 
 logger = logging.getLogger("agent")
 
+# Prompt context: files named in the traceback, whole if short, otherwise
+# the lines around the reported line numbers
+MAX_CONTEXT_FILES = 4
+FULL_FILE_LINES = 150
+EXCERPT_CONTEXT_LINES = 25
+# A second request when the first edits do not apply, with the conflicts
+FIX_ATTEMPTS = 2
+
+def record_fixed_file(state: AgentState, target_file: str, content: str, content_hash: str, source: str):
+    """
+    Keeps backend_files in sync with what is on disk so the build node can
+    tell which modules changed.
+    """
+    backend_files = state.get("backend_files", {})
+    previous = backend_files.get(target_file) or {}
+    backend_files[target_file] = {
+        "file_path": target_file,
+        "content": content,
+        "status": "patched",
+        "retry_count": previous.get("retry_count", 0) + 1,
+        "last_error": state.get("error_summary"),
+        "content_hash": content_hash,
+        "source": source
+    }
+    state["backend_files"] = backend_files
+
+def excerpt(content: str, line_numbers: List[int]) -> str:
+    lines = content.splitlines()
+    if len(lines) <= FULL_FILE_LINES or not line_numbers:
+        shown = [(1, min(len(lines), FULL_FILE_LINES))]
+    else:
+        shown = []
+        for number in sorted(set(line_numbers)):
+            start = max(number - EXCERPT_CONTEXT_LINES, 1)
+            end = min(number + EXCERPT_CONTEXT_LINES, len(lines))
+            if shown and start <= shown[-1][1] + 1:
+                shown[-1] = (shown[-1][0], max(end, shown[-1][1]))
+            else:
+                shown.append((start, end))
+
+    parts = []
+    for start, end in shown:
+        parts.append(f"(lines {start}-{end} of {len(lines)})\n" + "\n".join(lines[start - 1:end]))
+    return "\n...\n".join(parts)
+
+async def _read_project_file(state: AgentState, path: str) -> Optional[str]:
+    try:
+        return await read_file(path, state['project_name'], state['user_id'])
+    except FileNotFoundError:
+        return None
+
+def fix_locations(analysis: Optional[TracebackAnalysis]) -> Dict[str, List[int]]:
+    """
+    {file: line numbers} to show the model: the innermost project frame
+    first, then the module a failed import expected the name in, then the
+    outer frames.
+    """
+    if analysis is None or not (analysis.frames or analysis.import_source_file):
+        return {"backend/main.py": []}
+
+    locations: Dict[str, List[int]] = {}
+    frames = list(reversed(analysis.frames))
+    if frames:
+        locations[frames[0].file_path] = [frames[0].line]
+    if analysis.import_source_file:
+        locations.setdefault(analysis.import_source_file, [])
+    for frame in frames[1:]:
+        locations.setdefault(frame.file_path, []).append(frame.line)
+    return dict(list(locations.items())[:MAX_CONTEXT_FILES])
+
+async def build_fix_context(state: AgentState, analysis: Optional[TracebackAnalysis]) -> str:
+    sections = []
+    for path, line_numbers in fix_locations(analysis).items():
+        try:
+            content = await _read_project_file(state, path)
+        except Exception:
+            content = None
+        if content is not None:
+            sections.append(f"--- {path} {excerpt(content, line_numbers)}\n")
+    return "\n".join(sections)
+
+async def apply_quick_fix(state: AgentState, analysis: TracebackAnalysis) -> bool:
+    """
+    Deterministic fix for a missing dependency or import (see
+    app/agent/quick_fixes.py). False when none applies.
+    """
+    requirements_text = await _read_project_file(state, REQUIREMENTS_FILE)
+    fix = quick_fix(analysis, state.get("backend_files") or {}, requirements_text, state.get("project_plan"))
+    if fix is None:
+        return False
+
+    changed, description = fix
+    hashes = await write_files(changed, state['project_name'], state['user_id'])
+    for target_file, content in changed.items():
+        record_fixed_file(state, target_file, content, hashes[target_file], "patched")
+    state["current_file"] = next(iter(changed))
+    logger.info(f"Applied deterministic fix: {description}")
+    return True
+
 async def fix_backend_node(state: AgentState):
     logger.info(f"Attempting valid fix... Retry {state.get('retry_count')}")
-    
+
     error_msg = state.get("error_message")
 
     error_summary = state.get("error_summary") or error_msg[:2000]
-    
 
-    similar_memory = await find_similar_error(error_summary, threshold=0.85)
+    # The exception and where it was raised; also the error memory key, so
+    # the same failure matches across line shifts and output noise
+    analysis = analyze_traceback(error_msg or "")
+    memory_text = analysis.memory_text() if analysis else error_summary
+
+    # A remembered or cached answer for an error we already tried to fix
+    # would just repeat the failed fix
+    error_hash = error_memory_key(memory_text)
+    repeated_error = state.get("last_fix_error_hash") == error_hash
+    state["last_fix_error_hash"] = error_hash
+
+    if analysis and not repeated_error:
+        try:
+            if await apply_quick_fix(state, analysis):
+                return state
+        except Exception as e:
+            logger.warning(f"Deterministic fix failed, asking the model: {e}")
+
+    similar_memory = None if repeated_error else await find_similar_error(memory_text, threshold=0.85)
     if similar_memory:
         logger.info(f"Vector Memory Hit! Using stored fix for {similar_memory.file_path}")
         # Use stored corrected code
         target_file = similar_memory.file_path
         corrected_code = similar_memory.corrected_code
-        
-        await write_file(target_file, corrected_code, state['project_name'], state['user_id'])
+
+        content_hash = await write_file(target_file, corrected_code, state['project_name'], state['user_id'])
+        record_fixed_file(state, target_file, corrected_code, content_hash, "memory")
         state["current_file"] = target_file
 
         return state
 
-    prompt = f"""
+    try:
+        context = await build_fix_context(state, analysis)
+        project_files = ", ".join(sorted(state.get("backend_files") or {})) or "unknown"
+
+        prompt = f"""
     The backend build failed.
-    Error: {error_msg}
-    
-    Analyze the traceback to find the specific file causing the error.
-    
+    Error: {error_summary}
+
+    Project files: {project_files}
+
+    Relevant code:
+    {context}
+
+    Fix the error with search/replace edits, in as many files as needed.
+
     Response Format:
-    explanation: must start with 'FILE: relative/path/to/file.py' followed by the explanation.
-    corrected_code: The full corrected code for that file.
+    explanation: short explanation of the cause.
+    edits: list of {{file_path, search, replace}}. file_path is relative to the project
+    root (e.g. backend/app/models.py). search must be copied verbatim from the code above
+    and match exactly one place in the file; keep it short but unique. replace is the new
+    text for that block. To create a file or rewrite it completely, use an empty search
+    and put the whole file in replace.
     """
-    
-    try:
-        response_text = await generate_structured_content(prompt, ErrorFixResponse)
-        fix_data = json.loads(response_text)
-        
-        explanation = fix_data.get("explanation", "")
-        corrected_code = fix_data.get("corrected_code", "")
-        
-        target_file = "backend/main.py"
-        if "FILE: " in explanation:
-            parts = explanation.split("FILE: ")[1].split("\n")[0].split(" ")[0]
-            parts = parts.replace("'", "").replace('"', "")
-            if parts.strip():
-                if not parts.startswith("backend/"):
-                    target_file = f"backend/{parts}"
-                else:
-                    target_file = parts
-
-        await write_file(target_file, corrected_code, state['project_name'], state['user_id'])
-        
-        logger.info(f"Applied fix to {target_file}")
-        state["current_file"] = target_file
-        
-        await store_error_memory(error_summary, target_file, corrected_code)
-        
+
+        changed: Dict[str, str] = {}
+        feedback = ""
+        for attempt in range(FIX_ATTEMPTS):
+            fix_data: PatchFixResponse = await generate_structured_content(
+                prompt + feedback, PatchFixResponse, use_cache=not repeated_error and attempt == 0
+            )
+
+            paths = {normalize_path(edit.file_path) for edit in fix_data.edits}
+            originals = {path: await _read_project_file(state, path) for path in paths}
+            try:
+                changed = apply_edits(originals, fix_data.edits)
+            except PatchConflict as e:
+                logger.warning(f"Fix edits did not apply (attempt {attempt + 1}): {e}")
+                feedback = f"\n    Your previous edits did not apply: {e}. Copy search blocks exactly from the code above.\n"
+                continue
+            if changed:
+                break
+            feedback = "\n    Your previous edits did not change anything.\n"
+
+        if not changed:
+            raise Exception("No applicable fix edits")
+
+        hashes = await write_files(changed, state['project_name'], state['user_id'])
+        for target_file, content in changed.items():
+            record_fixed_file(state, target_file, content, hashes[target_file], "llm")
+
+        logger.info(f"Applied fix to {', '.join(changed)}")
+        state["current_file"] = next(iter(changed))
+
+        # Memory replays one file's full content, so only single-file fixes are stored
+        if len(changed) == 1:
+            target_file, content = next(iter(changed.items()))
+            await store_error_memory(memory_text, target_file, content)
+
     except Exception as e:
         logger.error(f"Fix failed: {e}")
         state["build_status"] = "failed"
-        
+
     return state
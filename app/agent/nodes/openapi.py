@@ -1,64 +1,133 @@
 import asyncio
-import subprocess
-import httpx
-import time
+import json
 import os
-import signal
+import socket
+import tempfile
+import time
+import httpx
 from app.agent.state import AgentState
 from app.core.config import settings
 from app.agent.utils import write_file
+from app.agent.process import run_process, start_process
 import logging
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger("agent")
 
+# Imports the generated app and writes app.openapi() to argv[1]. The schema
+# goes to a file because the app's modules may print to stdout on import.
+OPENAPI_DUMP_SCRIPT = """
+import json, sys
+from main import app
+with open(sys.argv[1], "w", encoding="utf-8") as f:
+    json.dump(app.openapi(), f)
+"""
+
+# Attempts with a fresh port when uvicorn loses the race for the one we picked
+SERVER_START_ATTEMPTS = 3
+
+def free_port() -> int:
+    """
+    An unused TCP port on 127.0.0.1 assigned by the OS.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def dump_openapi_schema(python_executable: Path, backend_path: Path) -> Optional[dict]:
+    """
+    Fast path: import main.app inside the project venv and dump its schema
+    without starting a server.
+    """
+    fd, schema_file = tempfile.mkstemp(prefix="openapi-", suffix=".json")
+    os.close(fd)
+    try:
+        result = await run_process(
+            python_executable, "-c", OPENAPI_DUMP_SCRIPT, schema_file,
+            cwd=backend_path,
+            timeout=settings.OPENAPI_DUMP_TIMEOUT,
+            label="openapi_dump"
+        )
+        if result.returncode != 0:
+            logger.warning(f"In-process OpenAPI dump failed, falling back to uvicorn: {result.output[-1000:]}")
+            return None
+        with open(schema_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"In-process OpenAPI dump failed, falling back to uvicorn: {e}")
+        return None
+    finally:
+        os.unlink(schema_file)
+
+async def _wait_for_schema(client: httpx.AsyncClient, process, port: int, deadline: float) -> Optional[dict]:
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if process.exited:
+            return None
+        try:
+            response = await client.get(f"http://127.0.0.1:{port}/openapi.json")
+            if response.status_code == 200:
+                return response.json()
+        except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError):
+            pass
+        except Exception as e:
+            logger.warning(f"Polling error: {e}")
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, 1)
+    return None
+
+async def fetch_openapi_from_server(python_executable: Path, backend_path: Path) -> Optional[dict]:
+    """
+    Fallback: run the app under uvicorn on a free port and fetch
+    /openapi.json once it answers.
+    """
+    deadline = time.monotonic() + settings.OPENAPI_SERVER_TIMEOUT
+
+    async with httpx.AsyncClient(timeout=2) as client:
+        for attempt in range(SERVER_START_ATTEMPTS):
+            port = free_port()
+            cmd = [python_executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)]
+
+            process = start_process(*cmd, cwd=backend_path, label="uvicorn")
+            try:
+                schema = await _wait_for_schema(client, process, port, deadline)
+            finally:
+                result = await process.stop()
+
+            if schema is not None:
+                return schema
+
+            error = result.stderr.decode(errors="replace")
+            if "address already in use" in error.lower() and time.monotonic() < deadline:
+                logger.info(f"Port {port} was taken, retrying on a new port")
+                continue
+
+            logger.error(f"uvicorn did not serve /openapi.json (attempt {attempt + 1}): {error[-1000:]}")
+            return None
+
+    return None
+
 async def extract_openapi_node(state: AgentState):
     logger.info("Extracting OpenAPI Schema...")
-    
+
     project_root = Path(settings.PROJECTS_DIR) / state['user_id'] / state['project_name']
     backend_path = project_root / "backend"
     venv_path = backend_path / "venv"
-    
-    port = 8000
-    
+
     # Use venv python
     if os.name == 'nt':
         python_executable = venv_path / "Scripts" / "python.exe"
     else:
         python_executable = venv_path / "bin" / "python"
-        
-    # Run uvicorn via python -m uvicorn
-    cmd = [str(python_executable), "-m", "uvicorn", "main:app", "--port", str(port)]
-    
-    process = None
+
     try:
-        process = subprocess.Popen(
-            cmd,
-            cwd=str(backend_path),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        
-        schema = None
-        start_time = time.time()
-        timeout = 20
-        
-        async with httpx.AsyncClient() as client:
-            while time.time() - start_time < timeout:
-                try:
-                    response = await client.get(f"http://localhost:{port}/openapi.json")
-                    if response.status_code == 200:
-                        schema = response.json()
-                        break
-                except httpx.ConnectError:
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    logger.warning(f"Polling error: {e}")
-                    await asyncio.sleep(1)
-        
+        schema = await dump_openapi_schema(python_executable, backend_path)
+        if schema is None:
+            schema = await fetch_openapi_from_server(python_executable, backend_path)
+
         if schema:
             logger.info("OpenAPI Schema fetched successfully.")
-            import json
             schema_str = json.dumps(schema, indent=2)
             await write_file("openapi.json", schema_str, state['project_name'], state['user_id'])
             state["openapi_schema"] = schema
@@ -66,17 +135,10 @@ async def extract_openapi_node(state: AgentState):
             logger.error("Failed to fetch OpenAPI schema within timeout.")
             state["error_message"] = "OpenAPI extraction timeout"
             state["build_status"] = "failed"
-            
+
     except Exception as e:
         logger.error(f"OpenAPI extraction failed: {e}")
         state["error_message"] = str(e)
         state["build_status"] = "failed"
-    finally:
-        if process:
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-    
+
     return state
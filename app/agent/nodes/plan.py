@@ -67,8 +67,10 @@ async def plan_node(state: AgentState):
     try:
         # 1. Get the parsed Pydantic object
         plan: ProjectPlan = await generate_structured_content(prompt, ProjectPlan)
+        # Generation reads backend_structure from here, keep it even if the markdown fails
+        state["project_plan"] = plan.model_dump()
         
-        # 2. Build Markdown using object attribute access
+        # 2. Build Markdown
         md_plan = f"# Project Plan: {plan.project_name}\n\n"
         
         # Using .get() style fallback isn't needed with Pydantic, 
@@ -84,12 +86,14 @@ async def plan_node(state: AgentState):
         
         md_plan += "## API Endpoints\n"
         endpoints = plan.api_endpoints or []
-        # Accessing nested attributes as objects (e.method, not e['method'])
-        md_plan += "\n".join([f"- **{e.method}** `{e.path}`: {e.description}" for e in endpoints]) + "\n\n"
+        # Endpoints and models are plain dicts (List[Dict[str, str]]) whose keys the model may omit
+        md_plan += "\n".join([
+            f"- **{e.get('method', '')}** `{e.get('path', '')}`: {e.get('description', '')}" for e in endpoints
+        ]) + "\n\n"
         
         md_plan += "## Database Models\n"
         models = plan.database_models or []
-        md_plan += "\n".join([f"- **{m.name}**: {m.description}" for m in models]) + "\n\n"
+        md_plan += "\n".join([f"- **{m.get('name', '')}**: {m.get('description', '')}" for m in models]) + "\n\n"
         
         # 3. Update State
         state["project_plan_markdown"] = md_plan
@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Search/replace edits produced by the fix node.
+#
+# Each edit names a file, a block of text that must occur exactly once in
+# it and the text to put in its place. An empty search block means the
+# replace text is the whole new file. Edits are applied in order to
+# in-memory copies; if any of them does not match, none are written.
+
+
+class PatchConflict(Exception):
+    pass
+
+
+def normalize_path(file_path: str) -> str:
+    """Project-relative backend path, e.g. "app/main.py" -> "backend/app/main.py"."""
+    path = file_path.strip().strip("'\"")
+    while path.startswith("./"):
+        path = path[2:]
+    path = path.lstrip("/")
+    return path if path.startswith("backend/") else f"backend/{path}"
+
+
+def _find_lines(content: str, search: str) -> Optional[Tuple[int, int]]:
+    """
+    Character span of the unique run of lines equal to search's lines when
+    trailing whitespace is ignored. None when there is no unique match.
+    """
+    lines = content.splitlines(keepends=True)
+    wanted = [line.rstrip() for line in search.strip("\n").splitlines()]
+    if not wanted:
+        return None
+
+    stripped = [line.rstrip() for line in lines]
+    matches = [
+        i for i in range(len(lines) - len(wanted) + 1)
+        if stripped[i:i + len(wanted)] == wanted
+    ]
+    if len(matches) != 1:
+        return None
+
+    start = sum(len(line) for line in lines[:matches[0]])
+    end = start + sum(len(line) for line in lines[matches[0]:matches[0] + len(wanted)])
+    # Keep the line break after the matched block
+    if lines[matches[0] + len(wanted) - 1].endswith("\n") and not search.endswith("\n"):
+        end -= 1
+    return start, end
+
+
+def apply_edit(content: Optional[str], search: str, replace: str, file_path: str) -> str:
+    if not search.strip():
+        return replace
+
+    if content is None:
+        raise PatchConflict(f"{file_path}: file does not exist")
+
+    count = content.count(search)
+    if count == 1:
+        return content.replace(search, replace, 1)
+    if count > 1:
+        raise PatchConflict(f"{file_path}: search block matches {count} places, include more context")
+
+    span = _find_lines(content, search)
+    if span is None:
+        raise PatchConflict(f"{file_path}: search block not found")
+    return content[:span[0]] + replace + content[span[1]:]
+
+
+def apply_edits(files: Dict[str, Optional[str]], edits: Iterable) -> Dict[str, str]:
+    """
+    Applies edits (objects with file_path / search / replace) to files
+    ({path: content or None if missing}) and returns the changed files.
+    Raises PatchConflict listing every edit that did not apply.
+    """
+    current = dict(files)
+    changed: Dict[str, str] = {}
+    conflicts: List[str] = []
+
+    for edit in edits:
+        path = normalize_path(edit.file_path)
+        try:
+            content = apply_edit(current.get(path), edit.search, edit.replace, path)
+        except PatchConflict as e:
+            conflicts.append(str(e))
+            continue
+        current[path] = content
+        changed[path] = content
+
+    if conflicts:
+        raise PatchConflict("; ".join(conflicts))
+    return {path: content for path, content in changed.items() if content != files.get(path)}
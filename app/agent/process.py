@@ -0,0 +1,405 @@
+import asyncio
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+from app.core.config import settings
+from app.core.metrics import record_subprocess
+import logging
+
+logger = logging.getLogger("build")
+
+# Runs commands and reports their wall time, CPU time, peak RSS and output
+# sizes (see app/core/metrics.py).
+#
+# asyncio's subprocess support reaps children with waitpid(), which discards
+# their resource usage, so the pipes are drained and the child is reaped with
+# wait4() in a daemon thread per command instead. Not a pool: servers and long
+# installs would hold a pool thread for their whole life, and commands queued
+# behind them would be neither drained nor timed out. CPU time comes from
+# wait4 and covers the command and the descendants it waited for. Peak RSS is sampled from
+# /proc/<pid>/status (VmHWM) while draining: wait4's ru_maxrss starts at the
+# RSS of the forking process, i.e. the whole worker. Where these are not
+# available (Windows, no procfs) the fields are None.
+#
+# Only the last SUBPROCESS_OUTPUT_TAIL_BYTES of each stream are kept in
+# memory; the full output is teed line by line to the job's log file
+# (current_job_log). Every command runs in its own process group so that a
+# timeout or cancellation also kills what it spawned (npm -> node, pip ->
+# build backends, uvicorn workers).
+
+# How long to keep reading after a timed-out process was killed; a process
+# that left the group (setsid) but inherited the pipes can keep them open.
+KILL_DRAIN_SECONDS = 2
+RSS_SAMPLE_INTERVAL = 0.05
+# Between SIGTERM and SIGKILL when a long-running process is stopped
+STOP_GRACE_SECONDS = 5
+
+# Set by the job runner; subprocess output of the job is appended to it
+current_job_log: ContextVar[Optional[Path]] = ContextVar("current_job_log", default=None)
+
+
+def job_log_path(job_id: str) -> Path:
+    return Path(settings.LOGS_DIR) / "jobs" / f"{job_id}.log"
+
+
+@dataclass
+class ProcessResult:
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    wall_time: float
+    cpu_time: Optional[float] = None
+    peak_rss: Optional[int] = None
+    timed_out: bool = False
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+
+    @property
+    def output(self) -> str:
+        """stderr if there is any, otherwise stdout (decoded)."""
+        return self.stderr.decode(errors="replace") or self.stdout.decode(errors="replace")
+
+
+class OutputTail:
+    """
+    Ring buffer with the last max_bytes of a stream (starting at a line
+    boundary once it wrapped) and the stream's total size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._chunks = deque()
+        self._size = 0
+
+    def feed(self, data: bytes):
+        self.total += len(data)
+        self._chunks.append(data)
+        self._size += len(data)
+        while len(self._chunks) > 1 and self._size - len(self._chunks[0]) >= self.max_bytes:
+            self._size -= len(self._chunks.popleft())
+
+    def getvalue(self) -> bytes:
+        data = b"".join(self._chunks)
+        if len(data) > self.max_bytes:
+            data = data[-self.max_bytes:]
+            newline = data.find(b"\n")
+            if newline != -1:
+                data = data[newline + 1:]
+        return data
+
+
+class _Capture:
+    """Output of one command: a tail per stream plus the job log tee."""
+
+    def __init__(self, cmd: Sequence[str], label: str, log_path: Optional[Path]):
+        self.stdout = OutputTail(settings.SUBPROCESS_OUTPUT_TAIL_BYTES)
+        self.stderr = OutputTail(settings.SUBPROCESS_OUTPUT_TAIL_BYTES)
+        self._prefix = {"stdout": f"[{label}] ".encode(), "stderr": f"[{label}:err] ".encode()}
+        self._partial = {"stdout": b"", "stderr": b""}
+        self._log = None
+
+        if log_path is not None:
+            try:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                # Unbuffered: each write is whole lines, so concurrent
+                # commands of the same job interleave by line
+                self._log = open(log_path, "ab", buffering=0)
+                self._log.write(f"$ {shlex.join(cmd)}\n".encode())
+            except OSError as e:
+                logger.warning(f"Cannot write job log {log_path}: {e}")
+                self._log = None
+
+    def feed(self, stream: str, data: bytes):
+        getattr(self, stream).feed(data)
+        if self._log is None:
+            return
+
+        lines = (self._partial[stream] + data).split(b"\n")
+        partial = lines.pop()
+        # Progress bars redraw with \r and may never end a line
+        if len(partial) > settings.SUBPROCESS_OUTPUT_TAIL_BYTES:
+            lines.append(partial)
+            partial = b""
+        self._partial[stream] = partial
+        if lines:
+            self._write(b"".join(self._prefix[stream] + line + b"\n" for line in lines))
+
+    def close(self, returncode: Optional[int]):
+        if self._log is None:
+            return
+        for stream, partial in self._partial.items():
+            if partial:
+                self._write(self._prefix[stream] + partial + b"\n")
+        self._write(b"%sexit %s\n" % (self._prefix["stdout"], str(returncode).encode()))
+        self._log.close()
+        self._log = None
+
+    def _write(self, data: bytes):
+        try:
+            self._log.write(data)
+        except OSError as e:
+            logger.warning(f"Job log write failed: {e}")
+
+
+def command_label(cmd: Sequence[str]) -> str:
+    """
+    Low-cardinality metric label: "pip install", "npm install", "venv", ...
+    """
+    args = [os.path.basename(str(cmd[0]))] + [str(arg) for arg in cmd[1:]]
+    if len(args) > 2 and args[1] == "-m":
+        args = args[2:]
+    name = os.path.splitext(args[0])[0]
+    if name in ("pip", "npm", "npx") and len(args) > 1 and not args[1].startswith("-"):
+        return f"{name} {args[1]}"
+    return name
+
+
+def _signal_group(proc: subprocess.Popen, terminate: bool = False):
+    """
+    Kills (or terminates) the command's process group, i.e. the command and
+    everything it spawned.
+    """
+    if not hasattr(os, "killpg"):
+        proc.terminate() if terminate else proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM if terminate else signal.SIGKILL)
+    except OSError:
+        # Group already gone
+        pass
+
+
+def _read_peak_rss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _collect_posix(proc: subprocess.Popen, deadline: Optional[float], capture: _Capture):
+    streams = {proc.stdout: "stdout", proc.stderr: "stderr"}
+    timed_out = False
+    peak_rss = _read_peak_rss(proc.pid)
+
+    with selectors.DefaultSelector() as selector:
+        for pipe in streams:
+            selector.register(pipe, selectors.EVENT_READ)
+
+        while selector.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                if timed_out:
+                    break
+                _signal_group(proc)
+                timed_out = True
+                deadline = time.monotonic() + KILL_DRAIN_SECONDS
+                continue
+
+            wait = RSS_SAMPLE_INTERVAL if remaining is None else min(remaining, RSS_SAMPLE_INTERVAL)
+            for key, _ in selector.select(wait):
+                data = os.read(key.fd, 65536)
+                if data:
+                    capture.feed(streams[key.fileobj], data)
+                else:
+                    selector.unregister(key.fileobj)
+
+            # VmHWM only grows; None once the process has exited
+            peak_rss = _read_peak_rss(proc.pid) or peak_rss
+
+    proc.stdout.close()
+    proc.stderr.close()
+
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return timed_out, rusage, peak_rss
+
+
+def _collect_fallback(proc: subprocess.Popen, deadline: Optional[float], capture: _Capture):
+    # No wait4 (Windows): communicate() buffers the output, the tail is taken afterwards
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    timed_out = False
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _signal_group(proc)
+        stdout, stderr = proc.communicate()
+        timed_out = True
+    capture.feed("stdout", stdout)
+    capture.feed("stderr", stderr)
+    return timed_out, None, None
+
+
+def _collect(proc: subprocess.Popen, deadline: Optional[float], capture: _Capture):
+    collect = _collect_posix if hasattr(os, "wait4") else _collect_fallback
+    try:
+        return collect(proc, deadline, capture)
+    finally:
+        capture.close(proc.returncode)
+
+
+def _start_collector(proc: subprocess.Popen, deadline: Optional[float], capture: _Capture) -> asyncio.Future:
+    """Runs _collect in a daemon thread; the future resolves on the running loop."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def collect():
+        result, error = None, None
+        try:
+            result = _collect(proc, deadline, capture)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # The loop was closed (shutdown); nobody is waiting
+            pass
+
+    threading.Thread(target=collect, name=f"subprocess-{proc.pid}", daemon=True).start()
+    return future
+
+
+class RunningProcess:
+    """
+    A command started by start_process. Its output is drained in the
+    background; wait() or stop() return the ProcessResult.
+    """
+
+    def __init__(self, proc: subprocess.Popen, label: str, start: float, capture: _Capture, future: asyncio.Future):
+        self.proc = proc
+        self.label = label
+        self._start = start
+        self._capture = capture
+        self._future = future
+        self._stopped = False
+        self._result: Optional[ProcessResult] = None
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    @property
+    def exited(self) -> bool:
+        """True once the command exited and its output was drained."""
+        return self._future.done()
+
+    async def wait(self) -> ProcessResult:
+        try:
+            timed_out, rusage, peak_rss = await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            # The collector thread sees EOF and reaps the child
+            if not self._future.done():
+                _signal_group(self.proc)
+            raise
+
+        if self._result is None:
+            self._result = self._finish(timed_out, rusage, peak_rss)
+        return self._result
+
+    async def stop(self, grace: float = STOP_GRACE_SECONDS) -> ProcessResult:
+        """
+        Terminates the process group, killing it if it is still running
+        after grace seconds.
+        """
+        if not self._future.done():
+            self._stopped = True
+            _signal_group(self.proc, terminate=True)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._future), grace)
+            except asyncio.TimeoutError:
+                _signal_group(self.proc)
+        return await self.wait()
+
+    def _finish(self, timed_out: bool, rusage, peak_rss: Optional[int]) -> ProcessResult:
+        wall = time.monotonic() - self._start
+        result = ProcessResult(
+            returncode=self.proc.returncode,
+            stdout=self._capture.stdout.getvalue(),
+            stderr=self._capture.stderr.getvalue(),
+            wall_time=wall,
+            cpu_time=rusage.ru_utime + rusage.ru_stime if rusage else None,
+            peak_rss=peak_rss,
+            timed_out=timed_out,
+            stdout_bytes=self._capture.stdout.total,
+            stderr_bytes=self._capture.stderr.total,
+        )
+
+        if timed_out:
+            outcome = "timeout"
+        else:
+            # A server we stopped ourselves did its job
+            outcome = "ok" if result.returncode == 0 or self._stopped else "error"
+        record_subprocess(
+            self.label, wall, result.cpu_time, result.peak_rss, result.stdout_bytes, result.stderr_bytes, outcome
+        )
+        logger.debug(f"{self.label} finished in {wall:.2f}s (exit {result.returncode})")
+        return result
+
+
+def start_process(
+    *cmd: Union[str, Path],
+    cwd: Optional[Union[str, Path]] = None,
+    env: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    label: Optional[str] = None,
+) -> RunningProcess:
+    """
+    Starts cmd in a new process group and drains its output in the
+    background. The group is killed when timeout (seconds) expires.
+    """
+    cmd = [str(arg) for arg in cmd]
+    label = label or command_label(cmd)
+    start = time.monotonic()
+
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    capture = _Capture(cmd, label, current_job_log.get())
+    deadline = start + timeout if timeout else None
+    future = _start_collector(proc, deadline, capture)
+    return RunningProcess(proc, label, start, capture, future)
+
+
+async def run_process(
+    *cmd: Union[str, Path],
+    cwd: Optional[Union[str, Path]] = None,
+    env: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    label: Optional[str] = None,
+) -> ProcessResult:
+    """
+    Runs cmd to completion and returns its output tail and resource usage.
+    The process group is killed when timeout (seconds, default
+    settings.SUBPROCESS_TIMEOUT) expires or the caller is cancelled.
+    """
+    timeout = timeout or settings.SUBPROCESS_TIMEOUT
+    process = start_process(*cmd, cwd=cwd, env=env, timeout=timeout, label=label)
+    return await process.wait()
@@ -0,0 +1,224 @@
+import ast
+import re
+import sys
+from typing import Dict, Optional, Set, Tuple
+from app.agent.build_cache import normalize_requirements
+from app.agent.import_graph import python_modules
+from app.agent.traceback_analyzer import TracebackAnalysis
+
+# Deterministic fixes for common build failures, applied without an LLM call:
+#   - ModuleNotFoundError for a well-known third party module (DISTRIBUTIONS):
+#     add its distribution to requirements.txt
+#   - "pip install X" in the error message: add X to requirements.txt
+#   - NameError for a name defined in exactly one other project module, or
+#     a well-known library name: add the import to the failing file
+# quick_fix returns ({file_path: new_content}, description) or None when
+# nothing applies.
+#
+# Other missing modules are left to the LLM fix: "No module named 'database'"
+# usually means a planned project module was never generated, and adding the
+# name to requirements.txt would install whatever PyPI package has it.
+
+REQUIREMENTS_FILE = "backend/requirements.txt"
+
+# Import name -> distribution name of the modules that may be added to
+# requirements.txt automatically
+DISTRIBUTIONS = {
+    **{name: name for name in (
+        "fastapi", "uvicorn", "starlette", "sqlalchemy", "alembic", "pydantic", "httpx", "requests",
+        "aiofiles", "asyncpg", "aiosqlite", "bcrypt", "redis", "celery", "pgvector", "stripe", "boto3",
+        "numpy", "pandas", "openai", "anthropic", "tenacity", "orjson", "itsdangerous",
+    )},
+    "jinja2": "Jinja2",
+    "slugify": "python-slugify",
+    "jose": "python-jose[cryptography]",
+    "jwt": "PyJWT",
+    "yaml": "PyYAML",
+    "dotenv": "python-dotenv",
+    "multipart": "python-multipart",
+    "passlib": "passlib[bcrypt]",
+    "psycopg2": "psycopg2-binary",
+    "pydantic_settings": "pydantic-settings",
+    "email_validator": "email-validator",
+    "dateutil": "python-dateutil",
+    "PIL": "Pillow",
+    "bs4": "beautifulsoup4",
+    "sklearn": "scikit-learn",
+    "cv2": "opencv-python",
+    "magic": "python-magic",
+}
+
+# Names generated code commonly uses without importing
+KNOWN_IMPORTS = {
+    **{name: f"from typing import {name}" for name in (
+        "Any", "Callable", "Dict", "Iterable", "List", "Literal", "Optional", "Set", "Tuple", "Union"
+    )},
+    "datetime": "from datetime import datetime",
+    "date": "from datetime import date",
+    "timedelta": "from datetime import timedelta",
+    "Enum": "from enum import Enum",
+    "os": "import os",
+    "json": "import json",
+    "uuid": "import uuid",
+    "BaseModel": "from pydantic import BaseModel",
+    "Field": "from pydantic import Field",
+    "EmailStr": "from pydantic import EmailStr",
+    **{name: f"from fastapi import {name}" for name in (
+        "APIRouter", "Depends", "FastAPI", "HTTPException", "Query", "status"
+    )},
+    **{name: f"from sqlalchemy import {name}" for name in (
+        "Boolean", "Column", "DateTime", "Float", "ForeignKey", "Integer", "String", "Text"
+    )},
+    "Session": "from sqlalchemy.orm import Session",
+    "relationship": "from sqlalchemy.orm import relationship",
+}
+
+_REQUIREMENT_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9.\-]*(?:\[[^\]]*\])?")
+
+
+def _requirement_spec(requirement: str) -> str:
+    # Normalized name plus extras, without version specifiers
+    normalized = normalize_requirements(requirement)
+    match = _REQUIREMENT_NAME_RE.match(normalized[0]) if normalized else None
+    return match.group(0) if match else requirement.lower()
+
+
+def add_requirement(requirements_text: Optional[str], requirement: str) -> Optional[str]:
+    """requirements_text with requirement appended, None if it is already listed."""
+    wanted = _requirement_spec(requirement)
+    present = {_requirement_spec(line) for line in normalize_requirements(requirements_text or "")}
+    if wanted in present:
+        return None
+    text = requirements_text or ""
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text + requirement + "\n"
+
+
+def _top_level_definitions(source: str) -> set:
+    names = set()
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.update(target.id for target in targets if isinstance(target, ast.Name))
+    return names
+
+
+def insert_import(source: str, statement: str) -> Optional[str]:
+    """
+    source with statement added after its leading imports (and docstring).
+    None if the source does not parse or already has the statement.
+    """
+    if statement in (line.strip() for line in source.splitlines()):
+        return None
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    insert_at = 0
+    for index, node in enumerate(tree.body):
+        is_docstring = (
+            index == 0 and isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        )
+        if is_docstring or isinstance(node, (ast.Import, ast.ImportFrom)):
+            insert_at = node.end_lineno
+        else:
+            break
+
+    lines = source.splitlines(keepends=True)
+    if insert_at and not lines[insert_at - 1].endswith("\n"):
+        lines[insert_at - 1] += "\n"
+    lines.insert(insert_at, statement + "\n")
+    return "".join(lines)
+
+
+def planned_packages(project_plan: Optional[dict]) -> Set[str]:
+    """Top-level module names of the plan's backend_structure ("app/db.py" -> "app")."""
+    packages = set()
+    for entry in (project_plan or {}).get("backend_structure") or []:
+        path = entry.strip()
+        while path.startswith("./"):
+            path = path[2:]
+        path = path.lstrip("/")
+        if path.startswith("backend/"):
+            path = path[len("backend/"):]
+        top_level = path.split("/")[0]
+        if top_level.endswith(".py"):
+            top_level = top_level[:-3]
+        if top_level.isidentifier():
+            packages.add(top_level)
+    return packages
+
+
+def _missing_dependency(
+    analysis: TracebackAnalysis, requirements_text: Optional[str], project_packages: Set[str]
+) -> Optional[Tuple[Dict[str, str], str]]:
+    requirement = analysis.pip_hint
+    if requirement is None and analysis.missing_module:
+        top_level = analysis.missing_module.split(".")[0]
+        if top_level in project_packages or top_level in getattr(sys, "stdlib_module_names", ()):
+            # A project module or the standard library: not a dependency problem
+            return None
+        requirement = DISTRIBUTIONS.get(top_level)
+    if requirement is None:
+        return None
+    if _requirement_spec(requirement).split("[")[0].replace("-", "_") in project_packages:
+        return None
+
+    updated = add_requirement(requirements_text, requirement)
+    if updated is None:
+        return None
+    return {REQUIREMENTS_FILE: updated}, f"added {requirement} to requirements.txt"
+
+
+def _missing_import(analysis: TracebackAnalysis, backend_files: Dict[str, dict]) -> Optional[Tuple[Dict[str, str], str]]:
+    if analysis.exception_type != "NameError" or not analysis.missing_name or not analysis.innermost:
+        return None
+
+    target = analysis.innermost.file_path
+    source = (backend_files.get(target) or {}).get("content")
+    if not source:
+        return None
+
+    name = analysis.missing_name
+    definers = []
+    for module, path in python_modules(backend_files).items():
+        if path == target:
+            continue
+        try:
+            if name in _top_level_definitions(backend_files[path].get("content") or ""):
+                definers.append(module)
+        except SyntaxError:
+            continue
+
+    if len(definers) == 1:
+        statement = f"from {definers[0]} import {name}"
+    elif not definers and name in KNOWN_IMPORTS:
+        statement = KNOWN_IMPORTS[name]
+    else:
+        return None
+
+    updated = insert_import(source, statement)
+    if updated is None:
+        return None
+    return {target: updated}, f"added '{statement}' to {target}"
+
+
+def quick_fix(
+    analysis: TracebackAnalysis,
+    backend_files: Dict[str, dict],
+    requirements_text: Optional[str],
+    project_plan: Optional[dict] = None,
+) -> Optional[Tuple[Dict[str, str], str]]:
+    if analysis.exception_type in ("ModuleNotFoundError", "ImportError", "RuntimeError"):
+        # Modules that exist or are planned but were never written
+        project_packages = {name.split(".")[0] for name in python_modules(backend_files)}
+        project_packages |= planned_packages(project_plan)
+        fix = _missing_dependency(analysis, requirements_text, project_packages)
+        if fix:
+            return fix
+    return _missing_import(analysis, backend_files)
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+from app.agent import build_cache
+from app.core.config import settings
+
+logger = logging.getLogger("build")
+
+# Pool of pre-seeded project venvs ("sandboxes").
+#
+# Layout of settings.SANDBOX_POOL_DIR:
+#   <key>/<id>/          a venv with SANDBOX_POOL_REQUIREMENTS installed
+#   <key>/<id>/.ready    marker written last
+#
+# The key is the build cache key of the base requirements (it includes the
+# interpreter), so changing them starts a new pool and the filler removes
+# the old one. A checked out sandbox is renamed into place as the project's
+# venv, and sync_environment then installs only the project's requirements
+# that are not in the base set. Sandboxes are never handed back: once
+# project packages are layered in they are no longer clean.
+#
+# Moving a venv is safe here because it is only ever run as
+# `python -m ...`; console scripts in bin/ keep the pool path in their
+# shebang.
+
+READY_MARKER = ".ready"
+
+pool_stats: Dict[str, int] = {"checkouts": 0, "empty": 0, "created": 0, "failed": 0}
+
+_wakeup: Optional[asyncio.Event] = None
+
+
+def get_pool_stats() -> Dict[str, int]:
+    return dict(pool_stats)
+
+
+def _base_requirements() -> str:
+    return "\n".join(p.strip() for p in settings.SANDBOX_POOL_REQUIREMENTS.split(",") if p.strip())
+
+
+def _pool_root() -> Path:
+    return Path(settings.SANDBOX_POOL_DIR)
+
+
+def _pool_dir() -> Path:
+    return _pool_root() / build_cache.environment_key(_base_requirements())
+
+
+def ready_sandboxes() -> List[Path]:
+    pool_dir = _pool_dir()
+    if not pool_dir.exists():
+        return []
+    return [path for path in pool_dir.iterdir() if (path / READY_MARKER).exists()]
+
+
+def checkout(venv_path: Path) -> bool:
+    """
+    Moves a ready sandbox to venv_path (which must not exist). False when
+    the pool is empty or the sandbox cannot be moved there.
+    """
+    if settings.SANDBOX_POOL_SIZE <= 0:
+        return False
+
+    for sandbox in ready_sandboxes():
+        try:
+            venv_path.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(sandbox, venv_path)
+        except FileNotFoundError:
+            # Taken by another worker
+            continue
+        except OSError as e:
+            # e.g. SANDBOX_POOL_DIR on another filesystem
+            logger.warning(f"Cannot check out sandbox {sandbox.name} to {venv_path}: {e}")
+            return False
+
+        (venv_path / READY_MARKER).unlink(missing_ok=True)
+        # An overlay venv's registration names the pool path
+        build_cache.register_overlay(venv_path)
+        pool_stats["checkouts"] += 1
+        logger.info(f"Checked out sandbox {sandbox.name} for {venv_path}")
+        if _wakeup is not None:
+            _wakeup.set()
+        return True
+
+    pool_stats["empty"] += 1
+    return False
+
+
+async def provision_environment(venv_path: Path, requirements_text: str):
+    """
+    build_cache.sync_environment for a project venv, starting from a pooled
+    sandbox when the project has no venv yet and the build cache does not
+    already hold the exact requirements set.
+    """
+    async with build_cache.venv_lock(venv_path):
+        if not venv_path.exists() and not (
+            settings.BUILD_CACHE_ENABLED and build_cache.has_environment(requirements_text)
+        ):
+            checkout(venv_path)
+
+    await build_cache.sync_environment(venv_path, requirements_text)
+
+
+async def create_sandbox() -> Path:
+    pool_dir = _pool_dir()
+    pool_dir.mkdir(parents=True, exist_ok=True)
+    sandbox_id = uuid4().hex[:12]
+    tmp_path = pool_dir / f".tmp-{sandbox_id}"
+
+    try:
+        await build_cache.sync_environment(tmp_path, _base_requirements())
+        (tmp_path / READY_MARKER).touch()
+        final_path = pool_dir / sandbox_id
+        os.rename(tmp_path, final_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    pool_stats["created"] += 1
+    return final_path
+
+
+def _remove_stale():
+    """Pools for other base requirements and leftovers of interrupted fills."""
+    pool_dir = _pool_dir()
+    if not _pool_root().exists():
+        return
+    for path in _pool_root().iterdir():
+        if path != pool_dir and not path.name.startswith("."):
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Removed sandbox pool {path.name[:12]}")
+
+    if pool_dir.exists():
+        for path in pool_dir.glob(".tmp-*"):
+            try:
+                if time.time() - path.stat().st_mtime > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+async def fill_pool():
+    await asyncio.to_thread(_remove_stale)
+    while len(ready_sandboxes()) < settings.SANDBOX_POOL_SIZE:
+        start = time.monotonic()
+        sandbox = await create_sandbox()
+        logger.info(f"Created sandbox {sandbox.name} in {time.monotonic() - start:.1f}s")
+
+
+async def run_filler():
+    """
+    Keeps the pool at settings.SANDBOX_POOL_SIZE until cancelled. Refills
+    right after a checkout, otherwise every SANDBOX_POOL_INTERVAL seconds.
+    """
+    global _wakeup
+    if settings.SANDBOX_POOL_SIZE <= 0:
+        return
+
+    _wakeup = asyncio.Event()
+    failures = 0
+    try:
+        while True:
+            _wakeup.clear()
+            try:
+                await fill_pool()
+                failures = 0
+            except Exception as e:
+                pool_stats["failed"] += 1
+                failures += 1
+                logger.warning(f"Sandbox pool fill failed: {e}")
+
+            delay = settings.SANDBOX_POOL_INTERVAL * min(2 ** failures, 30)
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _wakeup = None
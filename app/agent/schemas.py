@@ -13,6 +13,20 @@ class FileGeneration(BaseModel):
     file_path: str
     code: str
 
-class ErrorFixResponse(BaseModel):
+class ModuleContract(BaseModel):
+    file_path: str
+    purpose: str
+    exports: List[str]
+    imports_from: List[str]
+
+class BackendContract(BaseModel):
+    modules: List[ModuleContract]
+
+class FileEdit(BaseModel):
+    file_path: str
+    search: str
+    replace: str
+
+class PatchFixResponse(BaseModel):
     explanation: str
-    corrected_code: str
+    edits: List[FileEdit]
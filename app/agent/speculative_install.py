@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, List
+from app.agent.sandbox_pool import provision_environment
+from app.agent.state import AgentState
+from app.core.config import settings
+
+logger = logging.getLogger("build")
+
+# Background dependency installs that overlap with code generation.
+#
+# Installs are started as soon as a requirements set is known (first from
+# the plan's declared stack, then from the generated requirements.txt) and
+# run through build_cache.sync_environment (starting from a pooled sandbox,
+# see sandbox_pool.py), which serializes them per venv and only installs the
+# delta when the requirements change. The build node awaits whatever is
+# still in flight before its own sync.
+
+_tasks: Dict[str, List[asyncio.Task]] = {}
+
+
+def _project_key(user_id: str, project_name: str) -> str:
+    return f"{user_id}/{project_name}"
+
+
+def project_venv_path(user_id: str, project_name: str) -> Path:
+    return Path(settings.PROJECTS_DIR) / user_id / project_name / "backend" / "venv"
+
+
+def requirements_from_plan(state: AgentState) -> str:
+    """
+    Provisional requirements for the stack every plan is asked to use, plus
+    anything the plan pinned explicitly in tech_stack.
+    """
+    packages = [p.strip() for p in settings.SPECULATIVE_BASE_REQUIREMENTS.split(",") if p.strip()]
+    for value in (state.get("tech_stack") or {}).values():
+        if isinstance(value, str) and "==" in value:
+            packages.append(value.strip())
+    return "\n".join(packages)
+
+
+def start_speculative_install(user_id: str, project_name: str, requirements_text: str):
+    if not settings.SPECULATIVE_INSTALL_ENABLED or not requirements_text.strip():
+        return
+
+    venv_path = project_venv_path(user_id, project_name)
+
+    async def run():
+        logger.info(f"Speculative install started for {project_name}")
+        try:
+            await provision_environment(venv_path, requirements_text)
+            logger.info(f"Speculative install finished for {project_name}")
+        except Exception as e:
+            # The build node's own sync retries whatever is missing
+            logger.warning(f"Speculative install failed for {project_name}: {e}")
+
+    task = asyncio.create_task(run())
+    _tasks.setdefault(_project_key(user_id, project_name), []).append(task)
+
+
+async def wait_for_speculative_install(user_id: str, project_name: str):
+    tasks = _tasks.pop(_project_key(user_id, project_name), [])
+    if not tasks:
+        return
+
+    logger.info(f"Waiting for {len(tasks)} speculative install(s) of {project_name}")
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def discard_speculative_install(user_id: str, project_name: str):
+    for task in _tasks.pop(_project_key(user_id, project_name), []):
+        task.cancel()
@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Dict, Optional, Literal
+from typing import TypedDict, List, Dict, Optional, Literal, Any, Annotated
 
 class FileState(TypedDict):
     file_path: str 
@@ -9,20 +9,29 @@ class FileState(TypedDict):
     content_hash: Optional[str]
     source: Literal["llm", "memory", "patched"]
 
+def merge_files(current: Optional[Dict[str, FileState]], update: Optional[Dict[str, FileState]]) -> Dict[str, FileState]:
+    # Reducer for file maps written by parallel branches in the same step
+    return {**(current or {}), **(update or {})}
+
 class AgentState(TypedDict):
     user_prompt: str
     user_id: str
     project_name: str
     project_root: str
     project_plan_markdown: str
+    project_plan: Dict[str, Any]
     tech_stack: Dict[str, str]
     approved: bool
     backend_files: Dict[str, FileState]
-    frontend_files: Dict[str, FileState]
+    frontend_files: Annotated[Dict[str, FileState], merge_files]
     current_file: Optional[str]
     error_message: Optional[str]
     error_summary: Optional[str]
+    last_fix_error_hash: Optional[str]
     retry_count: int
     max_retries: int
     build_status: str
+    requirements_hash: Optional[str]
+    validated_hashes: Dict[str, str]
+    openapi_schema: Optional[Dict[str, Any]]
     iteration_count: int
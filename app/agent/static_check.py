@@ -0,0 +1,165 @@
+import ast
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+from app.agent.import_graph import python_modules, resolve_relative
+
+# Checks the generated backend from the in-memory file contents before the
+# import check subprocess runs:
+#   - every Python file parses and compiles
+#   - module-level imports of project modules resolve to a project file,
+#     and `from <project module> import name` finds name in that module
+#
+# Diagnostics are rendered like the tracebacks the import check would print
+# (with absolute paths under project_root), so the traceback analyzer, the
+# deterministic fixes and error memory treat both the same way. Imports
+# inside functions or try blocks, and modules using star imports or a
+# module-level __getattr__, are not second-guessed.
+
+
+@dataclass
+class Diagnostic:
+    file_path: str
+    line: int
+    message: str
+    # The same error in Python's traceback format
+    traceback: str
+
+    def __str__(self) -> str:
+        return f"{self.file_path}:{self.line}: {self.message}"
+
+
+def _module_level(body: List[ast.stmt]) -> Iterator[ast.stmt]:
+    """Statements that run on import, descending into if/with blocks."""
+    for node in body:
+        yield node
+        if isinstance(node, ast.If):
+            yield from _module_level(node.body)
+            yield from _module_level(node.orelse)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            yield from _module_level(node.body)
+
+
+def bound_names(tree: ast.Module) -> Optional[Set[str]]:
+    """
+    Names bound at module level, None if they cannot be known statically
+    (star imports, module __getattr__).
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            return None
+
+    for node in _module_level(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if node.name == "__getattr__":
+                return None
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.Try):
+            # Bindings in try blocks are conditional; accept them all
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    names.add(child.id)
+                elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    names.add(child.name)
+                elif isinstance(child, ast.alias):
+                    names.add(child.asname or child.name.split(".")[0])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.For, ast.AsyncFor, ast.With, ast.AsyncWith)):
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    names.add(child.id)
+        elif isinstance(node, ast.Expr):
+            # Walrus at module level
+            for child in ast.walk(node):
+                if isinstance(child, ast.NamedExpr):
+                    names.add(child.target.id)
+    return names
+
+
+def _module_exists(name: str, modules: Set[str]) -> bool:
+    # A module file, or a directory of them (namespace package)
+    return name in modules or any(module.startswith(name + ".") for module in modules)
+
+
+def _frame(filename: str, line: int) -> str:
+    return f'Traceback (most recent call last):\n  File "{filename}", line {line}, in <module>\n'
+
+
+def check_backend(backend_files: Dict[str, dict], project_root: Path) -> List[Diagnostic]:
+    """
+    Static diagnostics for every Python file in backend_files, in file order.
+    """
+    modules = python_modules(backend_files)
+    module_names = set(modules)
+    project_packages = {name.split(".")[0] for name in modules}
+    diagnostics: List[Diagnostic] = []
+    trees: Dict[str, ast.Module] = {}
+
+    for name, file_path in modules.items():
+        filename = str(project_root / file_path)
+        source = backend_files[file_path].get("content") or ""
+        try:
+            tree = ast.parse(source, filename)
+            # Symbol table errors ('return' outside function, ...) only show up here
+            compile(tree, filename, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            line = getattr(e, "lineno", None) or 1
+            rendered = "".join(traceback.format_exception_only(type(e), e))
+            diagnostics.append(Diagnostic(file_path, line, f"{type(e).__name__}: {getattr(e, 'msg', e)}", rendered))
+            continue
+        trees[name] = tree
+
+    bindings: Dict[str, Optional[Set[str]]] = {}
+
+    def names_of(module: str) -> Optional[Set[str]]:
+        if module not in bindings:
+            bindings[module] = bound_names(trees[module]) if module in trees else None
+        return bindings[module]
+
+    for name, tree in trees.items():
+        file_path = modules[name]
+        filename = str(project_root / file_path)
+        is_package = file_path.endswith("__init__.py")
+
+        for node in _module_level(tree.body):
+            if isinstance(node, ast.Import):
+                targets = [(alias.name, None) for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = resolve_relative(name, is_package, node.level, node.module) if node.level else (node.module or "")
+                targets = [(base, alias.name) for alias in node.names if alias.name != "*"]
+            else:
+                continue
+
+            for module, imported in targets:
+                if module.split(".")[0] not in project_packages:
+                    continue
+
+                if not _module_exists(module, module_names):
+                    message = f"ModuleNotFoundError: No module named '{module}'"
+                    diagnostics.append(Diagnostic(file_path, node.lineno, message, _frame(filename, node.lineno) + message))
+                    break
+
+                if imported is None or _module_exists(f"{module}.{imported}", module_names):
+                    continue
+                available = names_of(module)
+                if available is not None and imported not in available:
+                    source_file = project_root / modules[module] if module in modules else project_root
+                    message = f"ImportError: cannot import name '{imported}' from '{module}' ({source_file})"
+                    diagnostics.append(Diagnostic(file_path, node.lineno, message, _frame(filename, node.lineno) + message))
+                    break
+
+    return diagnostics
+
+
+def format_diagnostics(diagnostics: List[Diagnostic]) -> str:
+    """
+    One line per problem, then the first one as a full traceback (which is
+    what the traceback analyzer picks up).
+    """
+    lines = [f"Static check found {len(diagnostics)} problem(s):"]
+    lines += [f"  {diagnostic}" for diagnostic in diagnostics]
+    return "\n".join(lines) + "\n\n" + diagnostics[0].traceback.rstrip() + "\n"
@@ -0,0 +1,131 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Structured view of a Python traceback from the build's import check (or
+# any other command run in the project venv).
+#
+# Only frames in project files are kept; paths are mapped to the
+# project-relative form used in AgentState ("backend/app/models.py").
+# Chained tracebacks ("During handling of the above exception ...") are
+# reduced to the last one, which is the error that was actually raised.
+
+_FRAME_RE = re.compile(r'^\s*File "([^"]+)", line (\d+)(?:, in (.+))?$', re.MULTILINE)
+_EXCEPTION_RE = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning)):?\s?(.*)$")
+_CHAIN_RE = re.compile(
+    r"^(?:During handling of the above exception, another exception occurred:"
+    r"|The above exception was the direct cause of the following exception:)$",
+    re.MULTILINE
+)
+_MODULE_PATH_RE = re.compile(r"\(([^()\s]+\.py)\)")
+
+_MISSING_MODULE_RE = re.compile(r"No module named '([\w.]+)'")
+_CANNOT_IMPORT_RE = re.compile(r"cannot import name '(\w+)' from '([\w.]+)'")
+_NAME_ERROR_RE = re.compile(r"name '(\w+)' is not defined")
+_PIP_HINT_RE = re.compile(r"pip install ['\"]?([A-Za-z0-9][\w.\-]*(?:\[[\w,\-]+\])?)")
+
+
+@dataclass
+class Frame:
+    file_path: str
+    line: int
+    function: Optional[str] = None
+
+
+@dataclass
+class TracebackAnalysis:
+    exception_type: Optional[str]
+    message: str
+    # Project frames, outermost first
+    frames: List[Frame] = field(default_factory=list)
+    missing_module: Optional[str] = None
+    missing_name: Optional[str] = None
+    # "from <import_source> import <missing_name>" that failed, and the
+    # project file of import_source if there is one
+    import_source: Optional[str] = None
+    import_source_file: Optional[str] = None
+    # Package named by an "install it with pip install X" message
+    pip_hint: Optional[str] = None
+
+    @property
+    def innermost(self) -> Optional[Frame]:
+        return self.frames[-1] if self.frames else None
+
+    def memory_text(self) -> str:
+        """
+        Canonical text for error memory: the exception and where it was
+        raised, without line numbers that shift with every edit.
+        """
+        text = f"{self.exception_type or 'Error'}: {self.message}"
+        if self.innermost:
+            text += f"\nat {self.innermost.file_path} in {self.innermost.function or '<module>'}"
+        return text
+
+    def describe(self) -> str:
+        lines = [f"{self.exception_type or 'Error'}: {self.message}"]
+        for frame in reversed(self.frames):
+            lines.append(f"  at {frame.file_path}:{frame.line} in {frame.function or '<module>'}")
+        return "\n".join(lines)
+
+
+def project_path(path: str) -> Optional[str]:
+    """
+    ".../projects/<user>/<project>/backend/app/x.py" -> "backend/app/x.py";
+    None for the venv, the standard library and "<string>".
+    """
+    path = path.replace("\\", "/")
+    if "/venv/" in path or "site-packages" in path:
+        return None
+    index = path.rfind("/backend/")
+    return path[index + 1:] if index != -1 else None
+
+
+def analyze_traceback(error_text: str) -> Optional[TracebackAnalysis]:
+    """
+    Parses the last traceback in error_text. None when there is no
+    recognizable exception line.
+    """
+    if not error_text:
+        return None
+    last = _CHAIN_RE.split(error_text)[-1]
+
+    exception_type, message, details = None, "", ""
+    lines = last.strip().splitlines()
+    for index in range(len(lines) - 1, -1, -1):
+        match = _EXCEPTION_RE.match(lines[index].strip())
+        if match:
+            exception_type, message = match.group(1).split(".")[-1], match.group(2).strip()
+            # Messages can continue over several lines (install hints, pydantic errors)
+            details = "\n".join(lines[index:])
+            break
+    if exception_type is None:
+        return None
+
+    frames = []
+    for match in _FRAME_RE.finditer(last):
+        path = project_path(match.group(1))
+        if path:
+            frames.append(Frame(path, int(match.group(2)), match.group(3)))
+
+    analysis = TracebackAnalysis(exception_type, message, frames)
+
+    match = _MISSING_MODULE_RE.search(message)
+    if match:
+        analysis.missing_module = match.group(1)
+
+    match = _CANNOT_IMPORT_RE.search(message)
+    if match:
+        analysis.missing_name, analysis.import_source = match.group(1), match.group(2)
+        path_match = _MODULE_PATH_RE.search(message)
+        if path_match:
+            analysis.import_source_file = project_path(path_match.group(1))
+
+    match = _NAME_ERROR_RE.search(message)
+    if match and exception_type in ("NameError", "UnboundLocalError"):
+        analysis.missing_name = match.group(1)
+
+    match = _PIP_HINT_RE.search(details)
+    if match:
+        analysis.pip_hint = match.group(1)
+
+    return analysis
@@ -1,33 +1,74 @@
 import os
+import asyncio
+import hashlib
+import tempfile
 import aiofiles
 from pathlib import Path
+from typing import Dict
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger("agent")
 
+# Mode for new files, as open() would create them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+def _resolve_in_root(resolved_root: Path, file_path: str) -> Path:
+    target_path = (resolved_root / file_path).resolve()
+
+    # Security Check: Ensure strict containment
+    if not str(target_path).startswith(str(resolved_root)):
+        raise ValueError(f"Security Violation: Attempted to write outside project root: {target_path}")
+
+    return target_path
+
 def validate_path(file_path: str, project_name: str, user_id: str) -> Path:
     """
     Strictly validates that the file_path is within the project directory.
     """
     project_root = Path(settings.PROJECTS_DIR) / user_id / project_name
-    target_path = (project_root / file_path).resolve()
-    
-    # Security Check: Ensure strict containment
-    if not str(target_path).startswith(str(project_root.resolve())):
-        raise ValueError(f"Security Violation: Attempted to write outside project root: {target_path}")
-    
-    return target_path
+    return _resolve_in_root(project_root.resolve(), file_path)
+
+def hash_content(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _write_atomic(target_path: Path, content: str):
+    """
+    Writes content next to target_path and renames it into place, so
+    readers (and a crash) only ever see the old or the new file.
+    """
+    try:
+        mode = target_path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+
+    fd, temp_path = tempfile.mkstemp(dir=target_path.parent, prefix=f".{target_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
 
-async def write_file(file_path: str, content: str, project_name: str, user_id: str):
+async def write_file(file_path: str, content: str, project_name: str, user_id: str) -> str:
+    """
+    Writes the file and returns the sha256 of its content.
+    """
     try:
         target_path = validate_path(file_path, project_name, user_id)
         target_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        async with aiofiles.open(target_path, "w", encoding="utf-8") as f:
-            await f.write(content)
-        
+
+        await asyncio.to_thread(_write_atomic, target_path, content)
+
         logger.info(f"File written: {target_path}")
+        return hash_content(content)
     except ValueError as e:
         logger.error(str(e))
         raise
@@ -35,6 +76,40 @@ async def write_file(file_path: str, content: str, project_name: str, user_id: s
         logger.error(f"Error writing file {file_path}: {e}")
         raise
 
+async def write_files(files: Dict[str, str], project_name: str, user_id: str) -> Dict[str, str]:
+    """
+    Writes {file_path: content} with up to FILE_WRITE_CONCURRENCY writes in
+    flight and returns {file_path: sha256}. Every path is validated before
+    anything is written.
+    """
+    if not files:
+        return {}
+
+    project_root = (Path(settings.PROJECTS_DIR) / user_id / project_name).resolve()
+    try:
+        targets = {file_path: _resolve_in_root(project_root, file_path) for file_path in files}
+    except ValueError as e:
+        logger.error(str(e))
+        raise
+
+    for directory in sorted({target.parent for target in targets.values()}):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    semaphore = asyncio.Semaphore(max(1, settings.FILE_WRITE_CONCURRENCY))
+
+    async def write(file_path: str) -> str:
+        async with semaphore:
+            try:
+                await asyncio.to_thread(_write_atomic, targets[file_path], files[file_path])
+            except Exception as e:
+                logger.error(f"Error writing file {file_path}: {e}")
+                raise
+        return hash_content(files[file_path])
+
+    hashes = await asyncio.gather(*(write(file_path) for file_path in files))
+    logger.info(f"Files written: {len(files)} under {project_root}")
+    return dict(zip(files, hashes))
+
 async def read_file(file_path: str, project_name: str, user_id: str) -> str:
     try:
         target_path = validate_path(file_path, project_name, user_id)
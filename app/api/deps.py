@@ -3,7 +3,8 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import security
 from app.core.config import settings
@@ -18,9 +19,9 @@ def get_token_from_cookie(request: Request) -> Optional[str]:
     return request.cookies.get("access_token")
 
 
-def get_current_user(
+async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token_header: Optional[str] = Depends(oauth2_scheme)
 ) -> UserResponseSchema:
     
@@ -47,12 +48,12 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = db.query(User).filter(User.id == str(token_data.sub)).first()
+    user = (await db.execute(select(User).where(User.id == str(token_data.sub)))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> UserResponseSchema:
     if not current_user.is_active:
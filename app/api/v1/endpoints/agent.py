@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.models.user import User
-from app.models.job import Job
-from app.services.agent_service import run_agent_job
-from app.db.session import get_db
+from app.models.job import Job, JobStatus
+from app.services.job_queue import enqueue_job, requeue_job
+from app.services import job_events
+from app.core.config import settings
+from app.db.session import get_db, AsyncSessionLocal
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -18,41 +23,103 @@ class JobResponseSchema(BaseModel):
     status: str
 
 @router.post("/start", response_model=JobResponseSchema)
-def start_agent(
+async def start_agent(
     request: JobRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
 
-    job = Job(
-        user_id=current_user.id,
-        project_name=request.project_name,
-        status="pending"
-    )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
-    
-    background_tasks.add_task(
-        run_agent_job,
-        str(job.id),
-        request.prompt,
-        current_user.id,
-        request.project_name
-    )
+    # Picked up by a worker process (see worker.py)
+    job = await enqueue_job(db, current_user.id, request.project_name, request.prompt)
     
     return {"job_id": str(job.id), "status": "pending"}
 
+@router.post("/resume/{job_id}", response_model=JobResponseSchema)
+async def resume_agent(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    Re-queues a failed job. It continues from the last completed node.
+    """
+    job = await requeue_job(db, job_id, current_user.id)
+    if job:
+        return {"job_id": str(job.id), "status": "pending"}
+
+    existing = (await db.execute(
+        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+    )).scalars().first()
+    if not existing:
+        raise HTTPException(status_code=404, detail="Job not found")
+    raise HTTPException(status_code=409, detail=f"Job is {existing.status.value}, only failed jobs can be resumed")
+
 @router.get("/status/{job_id}", response_model=JobResponseSchema)
-def get_job_status(
+async def get_job_status(
     job_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
 
-    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    job = (await db.execute(
+        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+    )).scalars().first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     return {"job_id": str(job.id), "status": job.status}
+
+async def _job_status(job_id: str):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Job.status).where(Job.id == job_id))).scalar()
+
+@router.get("/events/{job_id}")
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    Server-Sent Events stream of a job's progress: node transitions, build
+    output tails, retry counts and the final result. Works on any replica;
+    events from the worker arrive through Postgres LISTEN/NOTIFY.
+    """
+    job = (await db.execute(
+        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+    )).scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    snapshot = {"job_id": job_id, "seq": 0, "type": "status", "data": {"status": job.status}}
+    finished = job.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+    # Do not hold a pooled connection for the lifetime of the stream
+    await db.close()
+
+    async def event_stream():
+        yield job_events.format_sse(snapshot)
+        if finished:
+            return
+
+        async with job_events.subscribe(job_id) as queue:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.JOB_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # The terminal event may have been sent before we subscribed
+                    status = await _job_status(job_id)
+                    if status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                        yield job_events.format_sse({**snapshot, "data": {"status": status}})
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield job_events.format_sse(event)
+                if event["type"] in job_events.TERMINAL_EVENTS:
+                    return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
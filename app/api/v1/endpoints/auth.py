@@ -1,9 +1,10 @@
+import asyncio
 from datetime import timedelta
 from typing import Any
 from sqlalchemy import select, delete, update, and_, or_
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 import bcrypt
 from app.core import security
@@ -18,16 +19,19 @@ from app.core.security import *
 router = APIRouter()
 
 @router.post("/login")
-def signin_user(
+async def signin_user(
     user_data: UserSigninSchema,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    existing_user = db.execute(select(User).where(User.id == user_data.id)).scalar_one_or_none()
+    existing_user = (await db.execute(select(User).where(User.id == user_data.id))).scalar_one_or_none()
     if not existing_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    verify_password = bcrypt.checkpw(user_data.password.encode("utf-8"), existing_user.password.encode("utf-8"))
+    # bcrypt is deliberately slow; keep it off the event loop
+    verify_password = await asyncio.to_thread(
+        bcrypt.checkpw, user_data.password.encode("utf-8"), existing_user.password.encode("utf-8")
+    )
     if not verify_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong credentials used to login")
     try:
@@ -71,10 +75,10 @@ def signin_user(
 
 
 @router.post("/refresh")
-def refresh_token(
+async def refresh_token(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
@@ -92,7 +96,7 @@ def refresh_token(
     except (jwt.JWTError):
         raise HTTPException(status_code=401, detail="Invalid refresh token")
         
-    user = db.query(User).filter(User.id == str(token_data.sub)).first()
+    user = (await db.execute(select(User).where(User.id == str(token_data.sub)))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -130,16 +134,16 @@ def refresh_token(
 
 
 @router.post("/refresh")
-def refresh_user_tokens(
+async def refresh_user_tokens(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user_token = request.cookies.get("access_token")
     if not user_token:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Token is not present so we cannot refresh")
     
-    current_user = db.execute(select(User).where(User.id == user_token.get("sub"))).scalar_one_or_none()
+    current_user = (await db.execute(select(User).where(User.id == user_token.get("sub")))).scalar_one_or_none()
     if not current_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="request User not found")
     
@@ -185,37 +189,37 @@ def refresh_user_tokens(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Server error lol")
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(response: Response):
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
     return {"message": "Logout successful"}
 
 @router.get("/me", response_model=UserResponseSchema)
-def read_users_me(
+async def read_users_me(
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     return current_user
 
 @router.post("/register", response_model=UserResponseSchema)
-def register_user(
+async def register_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserSignupSchema,
 ) -> Any:
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this user name already exists in the system",
         )
     
-    hashed_password = security.get_password_hash(user_in.password)
+    hashed_password = await asyncio.to_thread(security.get_password_hash, user_in.password)
     user = User(
         email=user_in.email,
         hashed_password=hashed_password,
         is_active=True,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
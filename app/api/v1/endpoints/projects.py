@@ -0,0 +1,55 @@
+import asyncio
+from typing import Literal, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.api import deps
+from app.models.user import User
+from app.services import project_archive
+
+router = APIRouter()
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+@router.get("/{project_name}/archive")
+async def download_project(
+    project_name: str,
+    format: Literal["zip", "tar.gz"] = Query("zip"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    The generated project as a zip or tar.gz archive, without virtualenvs
+    and node_modules. Streamed while it is built; supports If-None-Match.
+    """
+    user_id = str(current_user.id)
+    root = project_archive.project_root(user_id, project_name)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    files = await asyncio.to_thread(project_archive.scan_project, root)
+    etag = await asyncio.to_thread(project_archive.project_etag, files, format)
+    media_type, extension = project_archive.FORMATS[format]
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if project_archive.etag_matches(if_none_match, etag):
+        project_archive.archive_stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    filename = f"{root.name}{extension}"
+    cached = project_archive.cached_archive(user_id, root.name, etag, format)
+    if cached:
+        project_archive.archive_stats["cache_hits"] += 1
+        return FileResponse(
+            cached, media_type=media_type, filename=filename, headers=headers, content_disposition_type="attachment"
+        )
+
+    return StreamingResponse(
+        project_archive.stream_archive(user_id, root.name, files, format, etag),
+        media_type=media_type,
+        headers={**headers, "Content-Disposition": _content_disposition(filename)}
+    )
@@ -14,11 +14,23 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "ai_agent")
 
+    # Connection pool of the async engine (per process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.DATABASE_URL:
              self.DATABASE_URL = f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        # Same database, asyncpg driver
+        scheme, rest = self.DATABASE_URL.split("://", 1)
+        return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgres") else self.DATABASE_URL
+
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8 # We might need to change this as it is suspicious looking ai am i right? 
@@ -35,6 +47,113 @@ class Settings(BaseSettings):
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     PROJECTS_DIR: str = os.path.join(BASE_DIR, "projects")
     LOGS_DIR: str = os.path.join(BASE_DIR, "logs")
+    CACHE_DIR: str = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+
+    # Shared build environments (one venv per normalized requirements + interpreter)
+    BUILD_CACHE_ENABLED: bool = os.getenv("BUILD_CACHE_ENABLED", "True").lower() == "true"
+    BUILD_CACHE_DIR: str = os.getenv("BUILD_CACHE_DIR", os.path.join(CACHE_DIR, "build"))
+    BUILD_CACHE_MAX_BYTES: int = int(os.getenv("BUILD_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+
+    # Start installing dependencies while backend code is still being generated
+    SPECULATIVE_INSTALL_ENABLED: bool = os.getenv("SPECULATIVE_INSTALL_ENABLED", "True").lower() == "true"
+    SPECULATIVE_BASE_REQUIREMENTS: str = os.getenv(
+        "SPECULATIVE_BASE_REQUIREMENTS",
+        "fastapi,uvicorn,sqlalchemy,psycopg2-binary,pydantic,pydantic-settings,python-dotenv"
+    )
+
+    # Subprocess output: tail kept in memory per stream, full output teed to logs/jobs/<job_id>.log
+    SUBPROCESS_OUTPUT_TAIL_BYTES: int = int(os.getenv("SUBPROCESS_OUTPUT_TAIL_BYTES", str(64 * 1024)))
+    SUBPROCESS_JOB_LOGS: bool = os.getenv("SUBPROCESS_JOB_LOGS", "True").lower() == "true"
+    # Used by run_process when the caller gives no timeout
+    SUBPROCESS_TIMEOUT: int = int(os.getenv("SUBPROCESS_TIMEOUT", "900"))
+
+    # Project archive downloads: the last archive per project and format is kept for reuse
+    ARCHIVE_CACHE_DIR: str = os.getenv("ARCHIVE_CACHE_DIR", os.path.join(CACHE_DIR, "archives"))
+    ARCHIVE_CACHE_MAX_BYTES: int = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+    # Concurrent writes in utils.write_files
+    FILE_WRITE_CONCURRENCY: int = int(os.getenv("FILE_WRITE_CONCURRENCY", "8"))
+
+    # Import checks run in a fork of a long-lived per-venv checker process
+    # with the dependencies preloaded (falls back to `python -c` without fork)
+    IMPORT_CHECKER_ENABLED: bool = os.getenv("IMPORT_CHECKER_ENABLED", "True").lower() == "true"
+    IMPORT_CHECKER_MAX: int = int(os.getenv("IMPORT_CHECKER_MAX", "4"))
+    IMPORT_CHECK_TIMEOUT: int = int(os.getenv("IMPORT_CHECK_TIMEOUT", "120"))
+
+    # Pool of project venvs with the base requirements preinstalled, kept at
+    # SANDBOX_POOL_SIZE by a filler in each worker (0 disables it). Must be on
+    # the same filesystem as PROJECTS_DIR, a checkout is a rename.
+    SANDBOX_POOL_SIZE: int = int(os.getenv("SANDBOX_POOL_SIZE", "2"))
+    SANDBOX_POOL_DIR: str = os.getenv("SANDBOX_POOL_DIR", os.path.join(PROJECTS_DIR, ".sandbox_pool"))
+    SANDBOX_POOL_REQUIREMENTS: str = os.getenv("SANDBOX_POOL_REQUIREMENTS", SPECULATIVE_BASE_REQUIREMENTS)
+    SANDBOX_POOL_INTERVAL: float = float(os.getenv("SANDBOX_POOL_INTERVAL", "10"))
+
+    # Prebuilt frontend scaffolds (bump FRONTEND_TEMPLATE_VERSION to rebuild)
+    FRONTEND_TEMPLATE_DIR: str = os.getenv("FRONTEND_TEMPLATE_DIR", os.path.join(CACHE_DIR, "frontend"))
+    FRONTEND_TEMPLATE_VERSION: str = os.getenv("FRONTEND_TEMPLATE_VERSION", "1")
+    FRONTEND_TEMPLATE_KEEP: int = int(os.getenv("FRONTEND_TEMPLATE_KEEP", "2"))
+    FRONTEND_INSTALL_TIMEOUT: int = int(os.getenv("FRONTEND_INSTALL_TIMEOUT", "300"))
+    # Only use the local npm cache when a template has to be built
+    FRONTEND_OFFLINE: bool = os.getenv("FRONTEND_OFFLINE", "False").lower() == "true"
+
+    # LLM response cache (in-process LRU + on-disk store shared by workers)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_MEMORY_ENTRIES: int = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+    LLM_CACHE_DIR: str = os.getenv("LLM_CACHE_DIR", os.path.join(CACHE_DIR, "llm"))
+
+    # Error memory embeddings
+    EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    EMBEDDING_BATCH_WINDOW_MS: int = int(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10"))
+    EMBEDDING_MAX_BATCH_SIZE: int = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+    # Recent error hash -> fix entries kept in process ahead of the database
+    ERROR_MEMORY_LRU_SIZE: int = int(os.getenv("ERROR_MEMORY_LRU_SIZE", "512"))
+
+    # Approximate nearest neighbour index on errormemory.embedding ("hnsw" or "ivfflat")
+    ERROR_MEMORY_INDEX_TYPE: str = os.getenv("ERROR_MEMORY_INDEX_TYPE", "hnsw")
+    ERROR_MEMORY_HNSW_M: int = int(os.getenv("ERROR_MEMORY_HNSW_M", "16"))
+    ERROR_MEMORY_HNSW_EF_CONSTRUCTION: int = int(os.getenv("ERROR_MEMORY_HNSW_EF_CONSTRUCTION", "64"))
+    ERROR_MEMORY_HNSW_EF_SEARCH: int = int(os.getenv("ERROR_MEMORY_HNSW_EF_SEARCH", "40"))
+    ERROR_MEMORY_IVFFLAT_LISTS: int = int(os.getenv("ERROR_MEMORY_IVFFLAT_LISTS", "100"))
+    ERROR_MEMORY_IVFFLAT_PROBES: int = int(os.getenv("ERROR_MEMORY_IVFFLAT_PROBES", "10"))
+
+    # Backend generation: "single" asks for every file in one response,
+    # "stream" does the same but writes each file as it arrives, and
+    # "parallel" generates files from the plan's backend_structure concurrently
+    BACKEND_GENERATION_MODE: str = os.getenv("BACKEND_GENERATION_MODE", "parallel")
+    BACKEND_GENERATION_CONCURRENCY: int = int(os.getenv("BACKEND_GENERATION_CONCURRENCY", "4"))
+    BACKEND_GENERATION_GROUP_SIZE: int = int(os.getenv("BACKEND_GENERATION_GROUP_SIZE", "1"))
+
+    # OpenAPI extraction: in-venv app.openapi() dump, then uvicorn on a free port
+    OPENAPI_DUMP_TIMEOUT: int = int(os.getenv("OPENAPI_DUMP_TIMEOUT", "30"))
+    OPENAPI_SERVER_TIMEOUT: int = int(os.getenv("OPENAPI_SERVER_TIMEOUT", "20"))
+
+    # Job queue / worker pool
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "2"))
+    JOB_VISIBILITY_TIMEOUT: int = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+    JOB_HEARTBEAT_INTERVAL: int = int(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    RUN_EMBEDDED_WORKER: bool = os.getenv("RUN_EMBEDDED_WORKER", "False").lower() == "true"
+    # Prometheus endpoint of standalone workers (0 disables it)
+    WORKER_METRICS_PORT: int = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+    # LangGraph checkpoints in Postgres (thread_id = job_id) for resuming jobs
+    CHECKPOINT_ENABLED: bool = os.getenv("CHECKPOINT_ENABLED", "True").lower() == "true"
+    CHECKPOINT_POOL_SIZE: int = int(os.getenv("CHECKPOINT_POOL_SIZE", "5"))
+    CHECKPOINT_KEEP_COMPLETED: bool = os.getenv("CHECKPOINT_KEEP_COMPLETED", "False").lower() == "true"
+
+    # Job progress streaming (in-process fan-out + Postgres LISTEN/NOTIFY)
+    JOB_EVENTS_NOTIFY: bool = os.getenv("JOB_EVENTS_NOTIFY", "True").lower() == "true"
+    JOB_EVENTS_CHANNEL: str = os.getenv("JOB_EVENTS_CHANNEL", "job_events")
+    JOB_EVENTS_HISTORY: int = int(os.getenv("JOB_EVENTS_HISTORY", "50"))
+    JOB_EVENTS_QUEUE_SIZE: int = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "100"))
+    JOB_EVENTS_KEEPALIVE: int = int(os.getenv("JOB_EVENTS_KEEPALIVE", "15"))
+    JOB_EVENTS_OUTPUT_TAIL: int = int(os.getenv("JOB_EVENTS_OUTPUT_TAIL", "2000"))
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
 
@@ -0,0 +1,193 @@
+import functools
+import inspect
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+try:
+    import resource
+except ImportError:
+    # Windows: no rusage, peak RSS is not reported
+    resource = None
+
+# Prometheus metrics for the agent pipeline, plus a per-job summary of the
+# same measurements (JobTimings) that is persisted with the job.
+#
+# Node-level CPU time and peak RSS are process-wide (time.process_time and
+# ru_maxrss), so with several jobs per worker they include the other jobs.
+# Subprocess numbers are the child's own (see app/agent/process.py).
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RSS_BUCKETS = tuple(mb * 1024 ** 2 for mb in (16, 32, 64, 128, 256, 512, 1024, 2048, 4096))
+
+NODE_DURATION = Histogram(
+    "agent_node_duration_seconds", "Wall time of a graph node", ["node"], buckets=DURATION_BUCKETS
+)
+NODE_CPU = Counter("agent_node_cpu_seconds_total", "Process CPU time spent while a graph node ran", ["node"])
+NODE_RUNS = Counter("agent_node_runs_total", "Graph node executions", ["node", "outcome"])
+
+LLM_DURATION = Histogram(
+    "agent_llm_request_duration_seconds", "Latency of structured LLM calls", ["schema", "source"],
+    buckets=DURATION_BUCKETS
+)
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens used", ["model", "kind"])
+
+SUBPROCESS_DURATION = Histogram(
+    "agent_subprocess_duration_seconds", "Wall time of subprocesses", ["command"], buckets=DURATION_BUCKETS
+)
+SUBPROCESS_CPU = Counter("agent_subprocess_cpu_seconds_total", "User + system CPU time of subprocesses", ["command"])
+SUBPROCESS_PEAK_RSS = Histogram(
+    "agent_subprocess_peak_rss_bytes", "Peak resident set size of subprocesses", ["command"], buckets=RSS_BUCKETS
+)
+SUBPROCESS_OUTPUT = Counter("agent_subprocess_output_bytes_total", "Bytes written by subprocesses", ["command", "stream"])
+SUBPROCESS_RUNS = Counter("agent_subprocess_runs_total", "Subprocess executions", ["command", "outcome"])
+
+CACHE_EVENTS = Counter("agent_cache_events_total", "Hits, misses and evictions of the agent's caches", ["cache", "event"])
+
+
+def peak_rss_bytes(ru_maxrss: int) -> int:
+    # Linux reports kilobytes, macOS bytes
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+def process_peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    return peak_rss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _add(bucket: Dict[str, Any], **values):
+    bucket["count"] = bucket.get("count", 0) + 1
+    for key, value in values.items():
+        if value is None:
+            continue
+        if key.startswith("peak_"):
+            bucket[key] = max(bucket.get(key, 0), value)
+        else:
+            bucket[key] = round(bucket.get(key, 0) + value, 4)
+
+
+class JobTimings:
+    """
+    Aggregated measurements for one job: per node, per LLM schema and per
+    subprocess command.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.nodes: Dict[str, dict] = {}
+        self.llm: Dict[str, dict] = {}
+        self.subprocesses: Dict[str, dict] = {}
+
+    def summary(self) -> dict:
+        return {
+            "wall_seconds": round(time.monotonic() - self.started, 4),
+            "nodes": self.nodes,
+            "llm": self.llm,
+            "subprocesses": self.subprocesses,
+        }
+
+
+# Set by the job runner; tasks spawned from the job inherit it
+current_job_timings: ContextVar[Optional[JobTimings]] = ContextVar("current_job_timings", default=None)
+
+
+def record_node(node: str, wall: float, cpu: float, peak_rss: Optional[int], outcome: str):
+    NODE_DURATION.labels(node).observe(wall)
+    NODE_CPU.labels(node).inc(cpu)
+    NODE_RUNS.labels(node, outcome).inc()
+
+    timings = current_job_timings.get()
+    if timings:
+        _add(timings.nodes.setdefault(node, {}), wall_seconds=wall, cpu_seconds=cpu, peak_rss_bytes=peak_rss)
+
+
+def record_llm_call(schema: str, model: str, source: str, wall: float, usage: Any = None):
+    LLM_DURATION.labels(schema, source).observe(wall)
+
+    tokens = {}
+    if usage is not None:
+        tokens = {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+            "thoughts_tokens": getattr(usage, "thoughts_token_count", None),
+            "total_tokens": getattr(usage, "total_token_count", None),
+        }
+        for kind, count in tokens.items():
+            if count:
+                LLM_TOKENS.labels(model, kind.replace("_tokens", "")).inc(count)
+
+    timings = current_job_timings.get()
+    if timings:
+        bucket = timings.llm.setdefault(schema, {})
+        _add(bucket, wall_seconds=wall, **tokens)
+        if source == "cache":
+            bucket["cache_hits"] = bucket.get("cache_hits", 0) + 1
+
+
+def record_subprocess(
+    command: str,
+    wall: float,
+    cpu: Optional[float],
+    peak_rss: Optional[int],
+    stdout_bytes: int,
+    stderr_bytes: int,
+    outcome: str,
+):
+    SUBPROCESS_DURATION.labels(command).observe(wall)
+    if cpu is not None:
+        SUBPROCESS_CPU.labels(command).inc(cpu)
+    if peak_rss is not None:
+        SUBPROCESS_PEAK_RSS.labels(command).observe(peak_rss)
+    SUBPROCESS_OUTPUT.labels(command, "stdout").inc(stdout_bytes)
+    SUBPROCESS_OUTPUT.labels(command, "stderr").inc(stderr_bytes)
+    SUBPROCESS_RUNS.labels(command, outcome).inc()
+
+    timings = current_job_timings.get()
+    if timings:
+        _add(
+            timings.subprocesses.setdefault(command, {}),
+            wall_seconds=wall,
+            cpu_seconds=cpu,
+            peak_rss_bytes=peak_rss,
+            stdout_bytes=stdout_bytes,
+            stderr_bytes=stderr_bytes,
+        )
+
+
+def record_cache_event(cache: str, event: str):
+    CACHE_EVENTS.labels(cache, event).inc()
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """
+    Wraps a graph node (sync or async) to record its wall time, CPU time and
+    the process' peak RSS.
+    """
+    @functools.wraps(fn)
+    async def wrapper(state):
+        start = time.monotonic()
+        cpu_start = time.process_time()
+        outcome = "error"
+        try:
+            result = fn(state)
+            if inspect.isawaitable(result):
+                result = await result
+            outcome = "ok"
+            return result
+        finally:
+            record_node(
+                name,
+                time.monotonic() - start,
+                time.process_time() - cpu_start,
+                process_peak_rss(),
+                outcome,
+            )
+
+    return wrapper
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
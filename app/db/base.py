@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from typing import Any
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 
@@ -10,3 +11,8 @@ class Base:
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
+
+
+def utcnow() -> datetime:
+    # Columns are DateTime without time zone: asyncpg rejects aware values for them
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -2,6 +2,7 @@ import logging
 from sqlalchemy import text
 from app.db.session import engine
 from app.db.base import Base
+from app.db.vector_index import index_statements
 from app.models.user import User
 from app.models.project import Project
 from app.models.error_memory import ErrorMemory
@@ -13,6 +14,17 @@ logger = logging.getLogger(__name__)
 # this is basically using raw sql commands using sqlalchmey to make sure this pgvector extension
 # is enabled for us before we begin any kind of operations moving forward
 
+JOB_QUEUE_COLUMNS = [
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS prompt TEXT",
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS locked_by VARCHAR",
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP",
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS ix_job_status ON job (status)",
+    "CREATE INDEX IF NOT EXISTS ix_job_locked_until ON job (locked_until)",
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS timings JSON",
+]
+
 def init_db():
     try:
         with engine.connect() as connection:
@@ -22,6 +34,19 @@ def init_db():
         
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created.")
+
+        # create_all does not add columns to existing tables
+        with engine.connect() as connection:
+            for statement in JOB_QUEUE_COLUMNS:
+                connection.execute(text(statement))
+            connection.commit()
+            logger.info("Job queue columns created/verified.")
+
+        with engine.connect() as connection:
+            for statement in index_statements(ErrorMemory.__tablename__, "embedding"):
+                connection.execute(text(statement))
+            connection.commit()
+            logger.info("Error memory vector index created/verified.")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         raise
@@ -0,0 +1,49 @@
+from typing import List
+from app.core.config import settings
+
+# DDL and per-query settings for pgvector ANN indexes (cosine distance).
+# Shared by init_db, the error memory lookup and the lookup benchmark.
+
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+
+def index_name(table: str, column: str, index_type: str) -> str:
+    return f"ix_{table}_{column}_{index_type}"
+
+
+def index_statements(table: str, column: str, index_type: str = None) -> List[str]:
+    """
+    Statements that create the configured index and drop the other kind, so
+    switching ERROR_MEMORY_INDEX_TYPE does not leave two indexes behind.
+    """
+    index_type = index_type or settings.ERROR_MEMORY_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+
+    statements = [
+        f"DROP INDEX IF EXISTS {index_name(table, column, other)}"
+        for other in INDEX_TYPES if other != index_type
+    ]
+
+    if index_type == "hnsw":
+        options = f"m = {int(settings.ERROR_MEMORY_HNSW_M)}, ef_construction = {int(settings.ERROR_MEMORY_HNSW_EF_CONSTRUCTION)}"
+    else:
+        options = f"lists = {int(settings.ERROR_MEMORY_IVFFLAT_LISTS)}"
+
+    statements.append(
+        f"CREATE INDEX IF NOT EXISTS {index_name(table, column, index_type)} "
+        f"ON {table} USING {index_type} ({column} vector_cosine_ops) WITH ({options})"
+    )
+    return statements
+
+
+def search_settings_statements(index_type: str = None) -> List[str]:
+    """
+    SET LOCAL statements tuning recall vs. speed for the current transaction.
+    """
+    index_type = index_type or settings.ERROR_MEMORY_INDEX_TYPE
+    if index_type == "hnsw":
+        return [f"SET LOCAL hnsw.ef_search = {int(settings.ERROR_MEMORY_HNSW_EF_SEARCH)}"]
+    if index_type == "ivfflat":
+        return [f"SET LOCAL ivfflat.probes = {int(settings.ERROR_MEMORY_IVFFLAT_PROBES)}"]
+    return []
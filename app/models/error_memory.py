@@ -1,7 +1,6 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime
 from pgvector.sqlalchemy import Vector
-from datetime import datetime, timezone
-from app.db.base import Base
+from app.db.base import Base, utcnow
 from uuid import uuid4
 
 # now depends on whether we make errors globally or scope them out to per user/project kind of
@@ -14,4 +13,4 @@ class ErrorMemory(Base):
     file_path = Column(String, nullable=False)
     corrected_code = Column(Text, nullable=False)
     embedding = Column(Vector(384)) 
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
@@ -1,8 +1,7 @@
-from sqlalchemy import Column, String, Enum, DateTime, ForeignKey
+from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Integer, Text, JSON
 from uuid import uuid4
 import enum
-from datetime import datetime, timezone
-from app.db.base import Base
+from app.db.base import Base, utcnow
 from sqlalchemy.orm import relationship
 
 class JobStatus(str, enum.Enum):
@@ -16,9 +15,18 @@ class Job(Base):
     id = Column(String, primary_key=True, default=lambda: uuid4().hex)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     project_name = Column(String, nullable=False)
-    status = Column(Enum(JobStatus, name="project_job_status"), default=JobStatus.PENDING)
+    prompt = Column(Text, nullable=True)
+    status = Column(Enum(JobStatus, name="project_job_status"), default=JobStatus.PENDING, index=True)
     result_summary = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    # Per node / LLM / subprocess timings of the run (see app/core/metrics.py)
+    timings = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
+    # Queue bookkeeping (see app/services/job_queue.py)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="user_project_jobs")
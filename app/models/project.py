@@ -1,7 +1,6 @@
 from sqlalchemy import Column, String, ForeignKey, DateTime
 from uuid import uuid4
-from datetime import datetime, timezone
-from app.db.base import Base
+from app.db.base import Base, utcnow
 from sqlalchemy.orm import relationship
 
 class Project(Base):
@@ -9,6 +8,6 @@ class Project(Base):
     name = Column(String, index=True, nullable=False)
     slug = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     
     user = relationship("User", back_populates="user_projects")
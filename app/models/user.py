@@ -1,7 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from app.db.base import Base
+from app.db.base import Base, utcnow
 from uuid import uuid4 
-from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 
 class User(Base):
@@ -9,7 +8,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
-    date_created = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    date_created = Column(DateTime, default=utcnow)
     
     user_project_jobs = relationship("Job", back_populates="user")
     user_projects = relationship("Project", back_populates="user")
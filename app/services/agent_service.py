@@ -1,15 +1,61 @@
 import asyncio
+from typing import Optional
 from app.models.job import Job, JobStatus
-from app.agent.graph import app_graph
-from app.agent.state import AgentState
+from app.services.job_queue import finish_job
+from app.services import job_events
+from app.agent.graph import app_graph, compile_graph
+from app.agent.checkpoint import get_checkpointer, thread_config, delete_checkpoints
+from app.agent.state import AgentState, merge_files
+from app.agent.speculative_install import discard_speculative_install
+from app.agent.import_checker import discard_checker
+from app.agent.process import current_job_log, job_log_path
 from app.core.config import settings
+from app.core.metrics import JobTimings, current_job_timings
 import logging
 
 logger = logging.getLogger("agent")
 
 
-async def run_agent_job(job_id: str, prompt: str, user_id: int, project_name: str):
+_checkpointed_graph = None
+
+
+async def get_agent_graph():
+    """
+    The compiled graph, with the Postgres checkpointer when enabled.
+    """
+    global _checkpointed_graph
+    checkpointer = await get_checkpointer()
+    if checkpointer is None:
+        return app_graph
+    if _checkpointed_graph is None:
+        _checkpointed_graph = compile_graph(checkpointer)
+    return _checkpointed_graph
+
+
+def progress_payload(node: str, update: dict) -> dict:
+    """
+    What clients see for one node transition: the node that finished plus
+    the parts of the state they render (no file contents).
+    """
+    payload = {"node": node}
+    for key in ("build_status", "retry_count", "current_file"):
+        if key in update:
+            payload[key] = update[key]
+    if "backend_files" in update:
+        payload["backend_files"] = sorted(update["backend_files"] or {})
+    if update.get("build_status") == "failed" and update.get("error_message"):
+        payload["output_tail"] = update["error_message"][-settings.JOB_EVENTS_OUTPUT_TAIL:]
+    return payload
+
+
+async def run_agent_job(job_id: str, prompt: str, user_id: int, project_name: str, worker_id: Optional[str] = None):
     logger.info(f"Starting job {job_id} for project {project_name}")
+
+    # Collects node, LLM and subprocess timings of this run (child tasks included)
+    timings = JobTimings()
+    timings_token = current_job_timings.set(timings)
+    # Full subprocess output of this run (only a tail is kept in memory)
+    log_token = current_job_log.set(job_log_path(job_id) if settings.SUBPROCESS_JOB_LOGS else None)
     
     try:
 
@@ -19,6 +65,7 @@ async def run_agent_job(job_id: str, prompt: str, user_id: int, project_name: st
             "project_name": project_name,
             "project_root": "", 
             "project_plan_markdown": "",
+            "project_plan": {},
             "tech_stack": {},
             "approved": True, 
             "backend_files": {},
@@ -26,37 +73,77 @@ async def run_agent_job(job_id: str, prompt: str, user_id: int, project_name: st
             "current_file": None,
             "error_message": None,
             "error_summary": None,
+            "last_fix_error_hash": None,
             "retry_count": 0,
             "max_retries": 5, 
             "build_status": "pending",
+            "requirements_hash": None,
+            "validated_hashes": {},
+            "openapi_schema": None,
             "iteration_count": 0
         }
         
-        result = await app_graph.ainvoke(initial_state)
+        graph = await get_agent_graph()
+        config = thread_config(job_id)
+        graph_input = initial_state
+        result = dict(initial_state)
+
+        # A previous attempt of this job left a checkpoint: continue after the
+        # last node that completed instead of starting over from plan
+        snapshot = await graph.aget_state(config) if graph.checkpointer else None
+        if snapshot and snapshot.values:
+            graph_input = None
+            result = dict(snapshot.values)
+            logger.info(f"Resuming job {job_id} at {list(snapshot.next) or 'end'}")
+            await job_events.publish(job_id, "resumed", {"next": list(snapshot.next)})
+        else:
+            await job_events.publish(job_id, "started", {"project_name": project_name})
+
+        # Same run as ainvoke, but yields after every node so progress can be
+        # pushed; subgraphs=True includes the nodes inside the backend loop
+        async for _namespace, chunk in graph.astream(graph_input, config, stream_mode="updates", subgraphs=True):
+            for node, update in chunk.items():
+                if node.startswith("__"):
+                    # "__metadata__" of replayed steps, "__interrupt__"
+                    continue
+                update = update or {}
+                if "frontend_files" in update:
+                    # Same reducer as the graph state: parallel branches merge
+                    update = {**update, "frontend_files": merge_files(result.get("frontend_files"), update["frontend_files"])}
+                result.update(update)
+                await job_events.publish(job_id, "node", progress_payload(node, update))
         
-        from app.db.session import SessionLocal
-        job_db = SessionLocal()
         try:
-            job = job_db.query(Job).filter(Job.id == job_id).first()
-            if job:
-                job.status = JobStatus.COMPLETED
-                job.result_summary = "Completed successfully" 
-                job_db.commit()
-                logger.info(f"Job {job_id} completed.")
+            await finish_job(job_id, JobStatus.COMPLETED, "Completed successfully", worker_id, timings.summary())
+            logger.info(f"Job {job_id} completed.", extra={"extra_data": {"timings": timings.summary()}})
         except Exception as e:
             logger.error(f"Error updating job status: {e}")
-        finally:
-            job_db.close()
+
+        # Checkpoints are only needed to resume unfinished runs
+        if graph.checkpointer and not settings.CHECKPOINT_KEEP_COMPLETED:
+            try:
+                await delete_checkpoints(job_id)
+            except Exception as e:
+                logger.warning(f"Failed to delete checkpoints of job {job_id}: {e}")
+
+        await job_events.publish(job_id, "completed", {
+            "build_status": result.get("build_status"),
+            "retry_count": result.get("retry_count"),
+            "backend_files": sorted(result.get("backend_files") or {}),
+            "frontend_files": sorted(result.get("frontend_files") or {}),
+            "wall_seconds": timings.summary()["wall_seconds"],
+        })
             
+    except asyncio.CancelledError:
+        # Worker shutdown or lost lease: leave the job to the queue
+        logger.warning(f"Job {job_id} cancelled")
+        raise
     except Exception as e:
         logger.error(f"Job {job_id} failed: {e}")
-        from app.db.session import SessionLocal
-        job_db = SessionLocal()
-        try:
-            job = job_db.query(Job).filter(Job.id == job_id).first()
-            if job:
-                job.status = JobStatus.FAILED
-                job.result_summary = str(e)
-                job_db.commit()
-        finally:
-            job_db.close()
+        await finish_job(job_id, JobStatus.FAILED, str(e), worker_id, timings.summary())
+        await job_events.publish(job_id, "failed", {"error": str(e)})
+    finally:
+        current_job_timings.reset(timings_token)
+        current_job_log.reset(log_token)
+        discard_speculative_install(str(user_id), project_name)
+        discard_checker(str(user_id), project_name)
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Set
+from uuid import uuid4
+from sqlalchemy import text
+from app.db.session import AsyncSessionLocal, async_engine
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger("agent")
+
+# Job progress events.
+#
+# The process running a job publishes events with publish(). They are
+# delivered straight to subscribers in the same process and sent through
+# Postgres NOTIFY so API replicas serving the stream for that job receive
+# them through their LISTEN connection. Every process tags its events with
+# ORIGIN and ignores its own notifications, so local subscribers see each
+# event once.
+
+ORIGIN = f"{os.getpid()}-{uuid4().hex[:8]}"
+TERMINAL_EVENTS = {"completed", "failed"}
+
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+# Recent events per job so a subscriber that connects mid-run catches up
+_history: Dict[str, Deque[dict]] = {}
+_sequence: Dict[str, int] = {}
+
+_listener_task: Optional[asyncio.Task] = None
+_listener_stop: Optional[asyncio.Event] = None
+
+
+def _deliver(event: dict):
+    job_id = event["job_id"]
+    history = _history.setdefault(job_id, deque(maxlen=settings.JOB_EVENTS_HISTORY))
+    history.append(event)
+
+    for queue in list(_subscribers.get(job_id, ())):
+        if queue.full():
+            # Slow consumer: drop its oldest event rather than block the job
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    if event["type"] in TERMINAL_EVENTS and not _subscribers.get(job_id):
+        _forget(job_id)
+
+
+def _forget(job_id: str):
+    _history.pop(job_id, None)
+    _sequence.pop(job_id, None)
+
+
+def _encode(event: dict) -> str:
+    payload = json.dumps(event, default=str, ensure_ascii=False)
+    if len(payload.encode()) <= MAX_PAYLOAD_BYTES:
+        return payload
+
+    # Trim the largest text fields (build output) from the front until it fits
+    trimmed = dict(event)
+    data = dict(trimmed.get("data") or {})
+    trimmed["data"] = data
+    for key in sorted(data, key=lambda k: len(str(data[k])), reverse=True):
+        while isinstance(data[key], str) and data[key]:
+            overflow = len(payload.encode()) - MAX_PAYLOAD_BYTES
+            if overflow <= 0:
+                return payload
+            # Escaped / multi-byte characters take more than one byte each
+            width = len(json.dumps(data[key], ensure_ascii=False).encode()) / len(data[key])
+            data[key] = data[key][int(overflow / width) + 1:]
+            payload = json.dumps(trimmed, default=str, ensure_ascii=False)
+        if len(payload.encode()) <= MAX_PAYLOAD_BYTES:
+            return payload
+    return json.dumps({k: v for k, v in event.items() if k != "data"}, default=str)
+
+
+async def publish(job_id: str, event_type: str, data: Optional[Dict[str, Any]] = None):
+    """
+    Publishes a progress event for a job. Never raises: losing a progress
+    event must not fail the job.
+    """
+    _sequence[job_id] = _sequence.get(job_id, 0) + 1
+    event = {
+        "job_id": job_id,
+        "seq": _sequence[job_id],
+        "type": event_type,
+        "ts": time.time(),
+        "origin": ORIGIN,
+        "data": data or {},
+    }
+
+    _deliver(event)
+
+    if not settings.JOB_EVENTS_NOTIFY:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": settings.JOB_EVENTS_CHANNEL, "payload": _encode(event)}
+            )
+            await db.commit()
+    except Exception as e:
+        logger.warning(f"Failed to NOTIFY event for job {job_id}: {e}")
+
+
+def _on_notification(connection, pid, channel, payload):
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return
+    if event.get("origin") == ORIGIN or "job_id" not in event:
+        return
+    # Only keep state for jobs someone here is watching
+    if event["job_id"] in _subscribers:
+        _deliver(event)
+
+
+async def _listen_loop(stop_event: asyncio.Event):
+    backoff = 1
+    while not stop_event.is_set():
+        lost = asyncio.Event()
+        try:
+            async with async_engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection
+                await raw.add_listener(settings.JOB_EVENTS_CHANNEL, _on_notification)
+                raw.add_termination_listener(lambda _: lost.set())
+                logger.info(f"Listening for job events on '{settings.JOB_EVENTS_CHANNEL}'")
+                backoff = 1
+
+                stop_wait = asyncio.create_task(stop_event.wait())
+                lost_wait = asyncio.create_task(lost.wait())
+                try:
+                    await asyncio.wait({stop_wait, lost_wait}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    stop_wait.cancel()
+                    lost_wait.cancel()
+
+                if not lost.is_set():
+                    await raw.remove_listener(settings.JOB_EVENTS_CHANNEL, _on_notification)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Job event listener error: {e}")
+
+        if not stop_event.is_set():
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+def start_listener():
+    global _listener_task, _listener_stop
+    if not settings.JOB_EVENTS_NOTIFY or (_listener_task and not _listener_task.done()):
+        return
+    _listener_stop = asyncio.Event()
+    _listener_task = asyncio.create_task(_listen_loop(_listener_stop))
+
+
+async def stop_listener():
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_stop.set()
+    try:
+        await asyncio.wait_for(_listener_task, timeout=5)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        _listener_task.cancel()
+    _listener_task = None
+
+
+@asynccontextmanager
+async def subscribe(job_id: str):
+    """
+    Yields a queue receiving the job's events, starting with the ones this
+    process has already seen.
+    """
+    start_listener()
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.JOB_EVENTS_QUEUE_SIZE)
+    for event in _history.get(job_id, ()):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    _subscribers.setdefault(job_id, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        subscribers = _subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del _subscribers[job_id]
+                history = _history.get(job_id)
+                if history and history[-1]["type"] in TERMINAL_EVENTS:
+                    _forget(job_id)
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,184 @@
+from datetime import timedelta
+from typing import List, Optional
+from sqlalchemy import select, update, and_, or_, func, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.job import Job, JobStatus
+from app.db.session import AsyncSessionLocal
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger("agent")
+
+# Durable job queue backed by the `job` table.
+#
+# A job is claimable when it is pending, or when it is running but its
+# visibility timeout (locked_until) has expired because the worker holding
+# it stopped heartbeating. Claims use SELECT ... FOR UPDATE SKIP LOCKED so
+# any number of workers can poll concurrently without handing out the same
+# job twice.
+
+def utc_now():
+    # Use the database clock so workers on different hosts agree on expiry
+    return func.timezone("UTC", func.now(), type_=DateTime)
+
+
+async def enqueue_job(db: AsyncSession, user_id: str, project_name: str, prompt: str) -> Job:
+    job = Job(
+        user_id=user_id,
+        project_name=project_name,
+        prompt=prompt,
+        status=JobStatus.PENDING,
+        attempts=0
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def claim_jobs(worker_id: str, limit: int) -> List[dict]:
+    """
+    Atomically claims up to `limit` jobs for this worker and returns plain
+    dicts so the caller does not hold on to session-bound objects.
+    """
+    if limit <= 0:
+        return []
+
+    visibility = timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            expired = and_(Job.status == JobStatus.RUNNING, Job.locked_until < utc_now())
+
+            # Jobs that keep killing their workers are failed instead of retried forever
+            await db.execute(
+                update(Job)
+                .where(expired, Job.attempts >= settings.JOB_MAX_ATTEMPTS)
+                .values(
+                    status=JobStatus.FAILED,
+                    locked_by=None,
+                    locked_until=None,
+                    result_summary="Job exceeded maximum attempts"
+                )
+            )
+
+            stmt = (
+                select(Job)
+                .where(or_(Job.status == JobStatus.PENDING, expired))
+                .order_by(Job.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = (await db.execute(stmt)).scalars().all()
+
+            claimed = []
+            for job in jobs:
+                job.status = JobStatus.RUNNING
+                job.locked_by = worker_id
+                job.locked_until = utc_now() + visibility
+                job.heartbeat_at = utc_now()
+                job.attempts = (job.attempts or 0) + 1
+                claimed.append({
+                    "job_id": job.id,
+                    "user_id": job.user_id,
+                    "project_name": job.project_name,
+                    "prompt": job.prompt or "",
+                    "attempts": job.attempts
+                })
+
+        return claimed
+
+
+async def heartbeat(job_id: str, worker_id: str) -> bool:
+    """
+    Extends the visibility timeout. Returns False when the job is no longer
+    owned by this worker (it was reclaimed or finished elsewhere).
+    """
+    visibility = timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+            .values(locked_until=utc_now() + visibility, heartbeat_at=utc_now())
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def finish_job(
+    job_id: str,
+    status: JobStatus,
+    result_summary: Optional[str],
+    worker_id: Optional[str] = None,
+    timings: Optional[dict] = None
+):
+    async with AsyncSessionLocal() as db:
+        stmt = update(Job).where(Job.id == job_id)
+        if worker_id:
+            stmt = stmt.where(Job.locked_by == worker_id)
+        values = dict(
+            status=status,
+            result_summary=result_summary,
+            locked_by=None,
+            locked_until=None
+        )
+        if timings is not None:
+            values["timings"] = timings
+        await db.execute(stmt.values(**values))
+        await db.commit()
+
+
+async def release_job(job_id: str, worker_id: str):
+    """
+    Hands a claimed job back to the queue (e.g. on graceful shutdown) so
+    another worker can pick it up without waiting for the timeout.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+            .values(
+                status=JobStatus.PENDING,
+                locked_by=None,
+                locked_until=None,
+                attempts=Job.attempts - 1
+            )
+        )
+        await db.commit()
+
+
+async def requeue_stale_jobs() -> int:
+    """
+    Puts running jobs whose lease expired (their worker crashed or was
+    redeployed) back in the queue. Returns the number of jobs requeued;
+    they resume from their last checkpoint. Jobs whose lease is still valid
+    are left alone even if a heartbeat was missed: their worker may still
+    be running them.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(
+                Job.status == JobStatus.RUNNING,
+                Job.attempts < settings.JOB_MAX_ATTEMPTS,
+                Job.locked_until < utc_now()
+            )
+            .values(status=JobStatus.PENDING, locked_by=None, locked_until=None)
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def requeue_job(db: AsyncSession, job_id: str, user_id: str) -> Optional[Job]:
+    """
+    Queues a failed job again with a fresh attempt budget. Returns None when
+    the job does not exist, belongs to someone else or has not failed.
+    """
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.user_id == user_id, Job.status == JobStatus.FAILED)
+        .values(status=JobStatus.PENDING, attempts=0, locked_by=None, locked_until=None, result_summary=None)
+        .returning(Job)
+    )
+    job = result.scalars().first()
+    await db.commit()
+    return job
@@ -0,0 +1,351 @@
+import hashlib
+import os
+import queue
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger("agent")
+
+# Project downloads as zip or tar.gz archives.
+#
+# An archive is written by a producer thread into a bounded queue that the
+# response iterates, so only a few chunks are in memory however large the
+# project is. The ETag is derived from the archived paths and their
+# content hashes (cached per path/size/mtime), so unchanged projects answer
+# If-None-Match with 304 without reading any file.
+#
+# The streamed bytes are also written to ARCHIVE_CACHE_DIR. If the files
+# did not change while streaming, the copy is kept under its ETag, and the
+# next download of the same content is a plain file response. Starlette
+# sends that with the server's pathsend extension (zero-copy sendfile) when
+# the server supports it, and it supports Range requests for resumed
+# downloads.
+
+FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar.gz": ("application/gzip", ".tar.gz"),
+}
+
+EXCLUDED_DIRS = {"venv", ".venv", "node_modules", "__pycache__"}
+
+CHUNK_SIZE = 256 * 1024
+# Chunks buffered between the producer thread and the response
+QUEUE_CHUNKS = 8
+HASH_CACHE_ENTRIES = 8192
+
+archive_stats: Dict[str, int] = {"streamed": 0, "cache_hits": 0, "not_modified": 0, "cache_discarded": 0}
+
+_hash_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_hash_lock = threading.Lock()
+
+
+def get_archive_stats() -> Dict[str, int]:
+    return dict(archive_stats)
+
+
+@dataclass
+class ProjectFile:
+    arcname: str
+    path: Path
+    size: int
+    mtime_ns: int
+
+
+def project_root(user_id: str, project_name: str) -> Optional[Path]:
+    """The project's directory, None if it does not exist or escapes the user's directory."""
+    user_root = (Path(settings.PROJECTS_DIR) / user_id).resolve()
+    root = (user_root / project_name).resolve()
+    if root.parent != user_root or not root.is_dir():
+        return None
+    return root
+
+
+def scan_project(root: Path) -> List[ProjectFile]:
+    """
+    Regular files under root in archive order, without virtualenvs,
+    node_modules and symlinks (which could point outside the project).
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in EXCLUDED_DIRS and not os.path.islink(os.path.join(dirpath, d))
+        )
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            try:
+                st = path.lstat()
+            except FileNotFoundError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            arcname = f"{root.name}/{path.relative_to(root).as_posix()}"
+            files.append(ProjectFile(arcname, path, st.st_size, st.st_mtime_ns))
+    return files
+
+
+def _cache_digest(file: ProjectFile, digest: str):
+    with _hash_lock:
+        _hash_cache[(str(file.path), file.size, file.mtime_ns)] = digest
+        while len(_hash_cache) > HASH_CACHE_ENTRIES:
+            _hash_cache.popitem(last=False)
+
+
+def _file_digest(file: ProjectFile) -> str:
+    key = (str(file.path), file.size, file.mtime_ns)
+    with _hash_lock:
+        digest = _hash_cache.get(key)
+        if digest:
+            _hash_cache.move_to_end(key)
+            return digest
+
+    sha = hashlib.sha256()
+    with open(file.path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _cache_digest(file, digest)
+    return digest
+
+
+def _etag(fmt: str, entries: List[Tuple[str, str]]) -> str:
+    sha = hashlib.sha256(fmt.encode())
+    for arcname, digest in entries:
+        sha.update(f"\0{arcname}\0{digest}".encode())
+    # Weak: the same content archived twice differs in timestamps
+    return f'W/"{sha.hexdigest()[:32]}"'
+
+
+def project_etag(files: List[ProjectFile], fmt: str) -> str:
+    entries = []
+    for file in files:
+        try:
+            entries.append((file.arcname, _file_digest(file)))
+        except FileNotFoundError:
+            # Deleted since the scan; the streamed archive will not match
+            entries.append((file.arcname, ""))
+    return _etag(fmt, entries)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def _cache_path(user_id: str, project_name: str, etag: str, fmt: str) -> Path:
+    tag = etag.removeprefix("W/").strip('"')
+    return Path(settings.ARCHIVE_CACHE_DIR) / user_id / project_name / f"{tag}{FORMATS[fmt][1]}"
+
+
+def cached_archive(user_id: str, project_name: str, etag: str, fmt: str) -> Optional[Path]:
+    path = _cache_path(user_id, project_name, etag, fmt)
+    if not path.exists():
+        return None
+    # Eviction is least recently used
+    os.utime(path)
+    return path
+
+
+def evict(keep: Optional[Path] = None):
+    """Removes the least recently used archives until the cache fits in ARCHIVE_CACHE_MAX_BYTES."""
+    entries = []
+    total = 0
+    for path in Path(settings.ARCHIVE_CACHE_DIR).glob("*/*/*"):
+        if path.name.startswith("."):
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= settings.ARCHIVE_CACHE_MAX_BYTES:
+            return
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _publish(temp_path: Path, final_path: Path, fmt: str):
+    os.replace(temp_path, final_path)
+    # Older archives of this project in the same format are superseded
+    for path in final_path.parent.glob(f"*{FORMATS[fmt][1]}"):
+        if path != final_path and not path.name.startswith("."):
+            path.unlink(missing_ok=True)
+    evict(keep=final_path)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _QueueWriter:
+    """File object for zipfile/tarfile that hands what they write to the response."""
+
+    def __init__(self, cache_file):
+        self.queue: queue.Queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.cancelled = threading.Event()
+        self.cache_file = cache_file
+        self._pending = bytearray()
+
+    def write(self, data) -> int:
+        self._pending += data
+        if len(self._pending) >= CHUNK_SIZE:
+            self.flush_chunk()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def flush_chunk(self):
+        if not self._pending:
+            return
+        chunk = bytes(self._pending)
+        self._pending.clear()
+        if self.cache_file is not None:
+            self.cache_file.write(chunk)
+        self.put(chunk)
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise _Cancelled()
+            try:
+                self.queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+
+class _HashingReader:
+    def __init__(self, f):
+        self._f = f
+        self.sha = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.sha.update(data)
+        return data
+
+
+def _write_zip(writer: _QueueWriter, files: List[ProjectFile]) -> List[Tuple[str, str]]:
+    entries = []
+    with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for file in files:
+            try:
+                source = open(file.path, "rb")
+            except FileNotFoundError:
+                entries.append((file.arcname, ""))
+                continue
+            with source:
+                info = zipfile.ZipInfo.from_file(file.path, file.arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                reader = _HashingReader(source)
+                with archive.open(info, "w", force_zip64=file.size >= zipfile.ZIP64_LIMIT) as dest:
+                    while chunk := reader.read(CHUNK_SIZE):
+                        dest.write(chunk)
+            entries.append((file.arcname, reader.sha.hexdigest()))
+    return entries
+
+
+def _write_tar(writer: _QueueWriter, files: List[ProjectFile]) -> List[Tuple[str, str]]:
+    entries = []
+    with tarfile.open(fileobj=writer, mode="w|gz") as archive:
+        for file in files:
+            try:
+                source = open(file.path, "rb")
+            except FileNotFoundError:
+                entries.append((file.arcname, ""))
+                continue
+            with source:
+                info = archive.gettarinfo(fileobj=source, arcname=file.arcname)
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                reader = _HashingReader(source)
+                archive.addfile(info, reader)
+            entries.append((file.arcname, reader.sha.hexdigest()))
+    return entries
+
+
+def stream_archive(user_id: str, project_name: str, files: List[ProjectFile], fmt: str, etag: str) -> Iterator[bytes]:
+    """
+    Yields the archive of files. Meant to be iterated in a worker thread
+    (StreamingResponse does that for plain iterators).
+    """
+    cache_file = None
+    temp_path: Optional[Path] = None
+    if settings.ARCHIVE_CACHE_MAX_BYTES > 0:
+        final_path = _cache_path(user_id, project_name, etag, fmt)
+        try:
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(dir=final_path.parent, prefix=".", suffix=".tmp")
+            cache_file, temp_path = os.fdopen(fd, "wb"), Path(name)
+        except OSError as e:
+            logger.warning(f"Archive cache unavailable: {e}")
+
+    writer = _QueueWriter(cache_file)
+    done = object()
+
+    def produce():
+        published = False
+        try:
+            write = _write_zip if fmt == "zip" else _write_tar
+            entries = write(writer, files)
+            writer.flush_chunk()
+
+            if cache_file is not None:
+                cache_file.close()
+                # Files changed while streaming: the copy is not what the ETag names
+                if _etag(fmt, entries) == etag:
+                    _publish(temp_path, final_path, fmt)
+                    published = True
+                else:
+                    archive_stats["cache_discarded"] += 1
+                    for file, (_, digest) in zip(files, entries):
+                        if digest:
+                            _cache_digest(file, digest)
+            writer.put(done)
+        except _Cancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Archive of {project_name} failed: {e}")
+            try:
+                writer.put(e)
+            except _Cancelled:
+                pass
+        finally:
+            if cache_file is not None and not published:
+                cache_file.close()
+                temp_path.unlink(missing_ok=True)
+
+    archive_stats["streamed"] += 1
+    start = time.monotonic()
+    producer = threading.Thread(target=produce, name=f"archive-{project_name}", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = writer.queue.get()
+            if item is done:
+                logger.info(f"Streamed {fmt} archive of {project_name} in {time.monotonic() - start:.2f}s")
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The client went away (or the archive failed): stop the producer
+        writer.cancelled.set()
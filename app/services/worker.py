@@ -0,0 +1,103 @@
+import asyncio
+import os
+import socket
+from typing import Dict, Optional
+from uuid import uuid4
+from app.services import job_queue
+from app.services.agent_service import run_agent_job
+from app.agent.sandbox_pool import run_filler
+from app.agent.import_checker import stop_all_checkers
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger("agent")
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+
+
+async def _heartbeat_loop(job_id: str, worker_id: str, job_task: asyncio.Task):
+    while not job_task.done():
+        await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+        try:
+            still_owned = await job_queue.heartbeat(job_id, worker_id)
+        except Exception as e:
+            # A missed beat is fine as long as the next one lands before the timeout
+            logger.warning(f"Heartbeat failed for job {job_id}: {e}")
+            continue
+
+        if not still_owned:
+            logger.warning(f"Lost lease on job {job_id}, cancelling local run")
+            job_task.cancel()
+            return
+
+
+async def process_job(job: dict, worker_id: str):
+    job_id = job["job_id"]
+    logger.info(f"Worker {worker_id} picked up job {job_id} (attempt {job['attempts']})")
+
+    job_task = asyncio.create_task(
+        run_agent_job(job_id, job["prompt"], job["user_id"], job["project_name"], worker_id=worker_id)
+    )
+    beat_task = asyncio.create_task(_heartbeat_loop(job_id, worker_id, job_task))
+    try:
+        await job_task
+    finally:
+        beat_task.cancel()
+
+
+async def run_worker(concurrency: Optional[int] = None, stop_event: Optional[asyncio.Event] = None):
+    """
+    Polls the job table and runs up to `concurrency` agent jobs at a time.
+    Setting `stop_event` stops claiming new work; in-flight jobs are
+    cancelled and handed back to the queue.
+    """
+    concurrency = concurrency or settings.WORKER_CONCURRENCY
+    stop_event = stop_event or asyncio.Event()
+    worker_id = make_worker_id()
+    running: Dict[str, asyncio.Task] = {}
+
+    logger.info(f"Worker {worker_id} started with concurrency {concurrency}")
+
+    # Jobs orphaned by a crashed or redeployed worker continue from their checkpoint
+    try:
+        requeued = await job_queue.requeue_stale_jobs()
+        if requeued:
+            logger.info(f"Requeued {requeued} stale job(s) for resume")
+    except Exception as e:
+        logger.error(f"Failed to requeue stale jobs: {e}")
+
+    # Keeps pre-seeded venvs ready for the build step of new jobs
+    filler = asyncio.create_task(run_filler())
+
+    try:
+        while not stop_event.is_set():
+            free_slots = concurrency - len(running)
+            if free_slots > 0:
+                try:
+                    jobs = await job_queue.claim_jobs(worker_id, free_slots)
+                except Exception as e:
+                    logger.error(f"Failed to claim jobs: {e}")
+                    jobs = []
+
+                for job in jobs:
+                    task = asyncio.create_task(process_job(job, worker_id))
+                    running[job["job_id"]] = task
+                    task.add_done_callback(lambda _, job_id=job["job_id"]: running.pop(job_id, None))
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        filler.cancel()
+        for job_id, task in list(running.items()):
+            task.cancel()
+            try:
+                await job_queue.release_job(job_id, worker_id)
+            except Exception as e:
+                logger.error(f"Failed to release job {job_id}: {e}")
+        await asyncio.gather(filler, *running.values(), return_exceptions=True)
+        stop_all_checkers()
+        logger.info(f"Worker {worker_id} stopped")
@@ -0,0 +1,136 @@
+"""
+Error memory lookup latency at increasing table sizes.
+
+Fills a scratch table with random 384-dimensional unit vectors, builds the
+configured ANN index (ERROR_MEMORY_INDEX_TYPE, same DDL as init_db) and
+times the same thresholded single-query lookup find_similar_error uses,
+against an exact sequential scan. Also reports recall@1 of the index.
+
+    python -m benchmarks.error_memory_lookup --sizes 10000 100000 1000000
+
+Only the scratch table (dropped afterwards unless --keep) is touched.
+"""
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.db.vector_index import index_name, index_statements, search_settings_statements
+
+TABLE = "errormemory_benchmark"
+DIMENSIONS = 384
+INSERT_BATCH = 50_000
+
+
+def random_vector() -> str:
+    values = [random.gauss(0, 1) for _ in range(DIMENSIONS)]
+    norm = sum(v * v for v in values) ** 0.5
+    return "[" + ",".join(f"{v / norm:.6f}" for v in values) + "]"
+
+
+def fill_to(connection, current: int, target: int) -> int:
+    # Random vectors are generated server side; far faster than sending them
+    while current < target:
+        batch = min(INSERT_BATCH, target - current)
+        connection.execute(text(f"""
+            INSERT INTO {TABLE} (embedding)
+            SELECT (
+                SELECT array_agg(random() - 0.5)::vector({DIMENSIONS})
+                FROM generate_series(1, {DIMENSIONS})
+                WHERE g.i > 0
+            )
+            FROM generate_series(1, :batch) AS g(i)
+        """), {"batch": batch})
+        connection.commit()
+        current += batch
+    return current
+
+
+def lookup(connection, query: str, threshold: float, use_index: bool):
+    with connection.begin():
+        if use_index:
+            for statement in search_settings_statements():
+                connection.execute(text(statement))
+        else:
+            connection.execute(text("SET LOCAL enable_indexscan = off"))
+            connection.execute(text("SET LOCAL enable_bitmapscan = off"))
+
+        start = time.perf_counter()
+        row = connection.execute(text(f"""
+            SELECT id, embedding <=> CAST(:query AS vector) AS distance
+            FROM {TABLE}
+            WHERE embedding <=> CAST(:query AS vector) <= :max_distance
+            ORDER BY embedding <=> CAST(:query AS vector)
+            LIMIT 1
+        """), {"query": query, "max_distance": 1 - threshold}).first()
+        elapsed = time.perf_counter() - start
+
+    return elapsed, row[0] if row else None
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="similarity threshold; 0 always returns the nearest row so recall is measurable")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    index_type = settings.ERROR_MEMORY_INDEX_TYPE
+
+    with engine.connect() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        connection.execute(text(f"CREATE TABLE {TABLE} (id BIGSERIAL PRIMARY KEY, embedding vector({DIMENSIONS}))"))
+        connection.commit()
+
+        print(f"index={index_type} queries={args.queries} threshold={args.threshold}")
+        print(f"{'rows':>10} {'build_s':>8} {'seq_p50_ms':>11} {'seq_p95_ms':>11} {'ann_p50_ms':>11} {'ann_p95_ms':>11} {'recall@1':>9}")
+
+        rows = 0
+        try:
+            for size in sorted(args.sizes):
+                rows = fill_to(connection, rows, size)
+
+                start = time.perf_counter()
+                # Rebuilt at every size, as IVFFlat lists are trained on existing rows
+                connection.execute(text(f"DROP INDEX IF EXISTS {index_name(TABLE, 'embedding', index_type)}"))
+                for statement in index_statements(TABLE, "embedding", index_type):
+                    connection.execute(text(statement))
+                connection.execute(text(f"ANALYZE {TABLE}"))
+                connection.commit()
+                build_seconds = time.perf_counter() - start
+
+                queries = [random_vector() for _ in range(args.queries)]
+                exact, approximate, hits = [], [], 0
+                for query in queries:
+                    seq_time, seq_id = lookup(connection, query, args.threshold, use_index=False)
+                    ann_time, ann_id = lookup(connection, query, args.threshold, use_index=True)
+                    exact.append(seq_time * 1000)
+                    approximate.append(ann_time * 1000)
+                    hits += int(seq_id == ann_id)
+
+                print(
+                    f"{rows:>10} {build_seconds:>8.1f} "
+                    f"{statistics.median(exact):>11.2f} {percentile(exact, 0.95):>11.2f} "
+                    f"{statistics.median(approximate):>11.2f} {percentile(approximate, 0.95):>11.2f} "
+                    f"{hits / len(queries):>9.2f}"
+                )
+        finally:
+            if not args.keep:
+                connection.rollback()
+                connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+                connection.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.logging import setup_logging
@@ -27,6 +27,13 @@ app.add_middleware(
 async def root():
     return {"message": "AI Coding Agent is running."}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    from app.core.metrics import render_latest
+
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 @app.on_event("startup")
 async def startup_event():
     import os
@@ -34,5 +41,28 @@ async def startup_event():
     os.makedirs(settings.PROJECTS_DIR, exist_ok=True)
     os.makedirs(settings.LOGS_DIR, exist_ok=True)
 
+    # Local development convenience: run the job worker inside the API process
+    if settings.RUN_EMBEDDED_WORKER:
+        import asyncio
+        from app.services.worker import run_worker
+
+        app.state.worker_stop = asyncio.Event()
+        app.state.worker_task = asyncio.create_task(run_worker(stop_event=app.state.worker_stop))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "worker_task", None):
+        app.state.worker_stop.set()
+        await app.state.worker_task
+
+    from app.services.job_events import stop_listener
+    await stop_listener()
+
+    from app.agent.checkpoint import close_checkpointer
+    await close_checkpointer()
+
+    from app.db.session import async_engine
+    await async_engine.dispose()
+
 from app.api.v1.api import api_router
 app.include_router(api_router, prefix=settings.API_V1_STR)
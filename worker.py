@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import signal
+from prometheus_client import start_http_server
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.services.worker import run_worker
+from app.db.session import async_engine
+from app.agent.checkpoint import close_checkpointer
+
+setup_logging()
+
+# Standalone job worker, run separately from the API:
+#   python worker.py --concurrency 4
+
+async def main(concurrency: int):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows event loops do not support signal handlers
+            pass
+
+    try:
+        await run_worker(concurrency=concurrency, stop_event=stop_event)
+    finally:
+        await close_checkpointer()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run agent jobs from the job queue")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument("--metrics-port", type=int, default=settings.WORKER_METRICS_PORT)
+    args = parser.parse_args()
+
+    # Workers are separate processes, so they serve their own /metrics
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+
+    asyncio.run(main(args.concurrency))